@@ -1,13 +1,13 @@
 {
     'name': 'Soft Delete Manager',
-    'version': '16.0.3.0.0',
+    'version': '16.0.4.3.0',
     'summary': 'Manage soft delete functionality for Odoo models',
     'description': '''
         This module allows administrators to configure soft delete functionality
         for selected Odoo models. Features include:
         - Enabling soft delete for specific models.
         - Adding a "Recover Deleted" button on tree views.
-        - A wizard to recover or permanently delete records.
+        - A shared recycle bin to recover or permanently delete records.
         For more details, see the README file.
     ''',
     'category': 'Tools',
@@ -17,6 +17,13 @@
     'depends': ['base', 'web'],
     'data': [
         'security/ir.model.access.csv',
+        'data/ir_cron_data.xml',
+        'views/soft_delete_recycle_bin_views.xml',
+        'views/soft_delete_manager_model_views.xml',
+        'views/soft_delete_job_views.xml',
+        'views/soft_delete_journal_views.xml',
+        'views/soft_delete_tombstone_views.xml',
+        'views/soft_delete_stats_views.xml',
         'views/soft_delete_config_settings_views.xml',
     ],
     'assets': {
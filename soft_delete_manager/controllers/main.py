@@ -0,0 +1,25 @@
+from odoo import http
+from odoo.http import content_disposition, request
+import logging
+
+_logger = logging.getLogger(__name__)
+
+# Content type of each export format
+EXPORT_CONTENT_TYPES = {
+    'csv': 'text/csv;charset=utf-8',
+    'jsonl': 'application/x-ndjson;charset=utf-8',
+}
+
+
+class SoftDeleteExportController(http.Controller):
+
+    @http.route('/soft_delete_manager/export/<string:model_name>', type='http', auth='user')
+    def export_deleted_records(self, model_name, export_format='csv', **kwargs):
+        """Stream the soft-deleted records of a configured model as CSV or JSON lines."""
+        stream = request.env['soft.delete.manager.config']._stream_deleted_records(model_name, export_format)
+        filename = f"{model_name.replace('.', '_')}_deleted.{export_format}"
+        _logger.info(f"Streaming export of deleted {model_name} records as {export_format}")
+        return request.make_response(stream, headers=[
+            ('Content-Type', EXPORT_CONTENT_TYPES[export_format]),
+            ('Content-Disposition', content_disposition(filename)),
+        ])
@@ -0,0 +1,23 @@
+from odoo import api, SUPERUSER_ID
+import logging
+
+_logger = logging.getLogger(__name__)
+
+
+def migrate(cr, version):
+    """Replace the x_<model>_wizard models of every configured model by the shared recycle bin.
+
+    The wizards only held copies of soft-deleted records, which the recycle bin reads from
+    their own table, so their rows are dropped with them.
+    """
+    env = api.Environment(cr, SUPERUSER_ID, {})
+    env['ir.actions.server'].search([('name', '=like', 'Populate x_%_wizard Records')]).unlink()
+    wizard_models = env['ir.model'].search([
+        ('model', '=like', 'x_%_wizard'),
+        ('state', '=', 'manual'),
+    ]).filtered(lambda m: {'x_model_id', 'x_record_id', 'x_display_name'} <= set(m.field_id.mapped('name')))
+    if wizard_models:
+        env['ir.ui.view'].search([('model', 'in', wizard_models.mapped('model'))]).unlink()
+        env['ir.actions.server'].search([('model_id', 'in', wizard_models.ids)]).unlink()
+        _logger.info(f"Removing {len(wizard_models)} recycle bin wizard models: {wizard_models.mapped('model')}")
+        wizard_models.unlink()
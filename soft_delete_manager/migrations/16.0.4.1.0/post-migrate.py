@@ -0,0 +1,11 @@
+from odoo import api, SUPERUSER_ID
+
+
+def migrate(cr, version):
+    """Mark the models enabled before the enablement was tracked as ready, and queue the others."""
+    env = api.Environment(cr, SUPERUSER_ID, {})
+    settings = env['soft.delete.manager.model'].search([])
+    settings.filtered(
+        lambda setting: setting.model in env and 'x_is_deleted' in env[setting.model]._fields
+    ).write({'enable_state': 'ready'})
+    env.ref('soft_delete_manager.ir_cron_soft_delete_enable')._trigger()
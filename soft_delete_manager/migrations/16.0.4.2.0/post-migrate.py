@@ -0,0 +1,17 @@
+from odoo import api, SUPERUSER_ID
+
+
+def migrate(cr, version):
+    """Repair the configured models once, and queue the build of their indexes for the enablement cron.
+
+    The indexes, including the deletion time index of the recycle bin, are built concurrently
+    by the cron once the upgrade is committed, never within the upgrade transaction.
+    """
+    env = api.Environment(cr, SUPERUSER_ID, {})
+    env['res.config.settings'].repair_soft_delete_configuration()
+    # Settings lines created by the repair for models enabled before the enablement was tracked
+    settings = env['soft.delete.manager.model'].search([('enable_state', 'in', ('pending', 'ready'))])
+    settings.filtered(
+        lambda setting: setting.model in env and 'x_is_deleted' in env[setting.model]._fields
+    ).write({'enable_state': 'indexing', 'enable_error': False, 'enable_attempts': 0})
+    env.ref('soft_delete_manager.ir_cron_soft_delete_enable')._trigger()
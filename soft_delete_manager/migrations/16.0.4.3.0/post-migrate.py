@@ -0,0 +1,20 @@
+from odoo import api, SUPERUSER_ID
+from odoo.addons.soft_delete_manager.models.soft_delete_manager_config import _soft_delete_index_name
+
+
+def migrate(cr, version):
+    """Drop the index on not deleted records built with the old predicate, and queue its rebuild.
+
+    The old predicate ``x_is_deleted IS NOT TRUE`` is not matched by PostgreSQL to the
+    condition the ORM compiles for ``('x_is_deleted', '=', False)``, so the index was never
+    used. The enablement cron rebuilds it concurrently once the upgrade is committed.
+    """
+    env = api.Environment(cr, SUPERUSER_ID, {})
+    config = env['soft.delete.manager.config']
+    settings = env['soft.delete.manager.model'].search([('enable_state', '=', 'ready')])
+    settings = settings.filtered(lambda setting: setting.model in env and 'x_is_deleted' in env[setting.model]._fields)
+    for setting in settings:
+        index_name = _soft_delete_index_name(config._get_table_name(setting.model), 'x_not_deleted_idx')
+        cr.execute(f'DROP INDEX IF EXISTS "{index_name}"')
+    settings.write({'enable_state': 'indexing', 'enable_error': False, 'enable_attempts': 0})
+    env.ref('soft_delete_manager.ir_cron_soft_delete_enable')._trigger()
@@ -1,3 +1,9 @@
 from . import soft_delete_config_settings
 from . import soft_delete_manager_config
 from . import soft_delete_mixin
+from . import soft_delete_recycle_bin
+from . import soft_delete_manager_model
+from . import soft_delete_job
+from . import soft_delete_journal
+from . import soft_delete_tombstone
+from . import soft_delete_stats
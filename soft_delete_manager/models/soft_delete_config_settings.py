@@ -1,9 +1,14 @@
 from odoo import models, fields, api, _
 import logging
+import time
 from lxml import etree
 
 _logger = logging.getLogger(__name__)
 
+# Name of the tree view extensions adding the Recover Deleted button
+DYNAMIC_VIEW_NAME = 'soft_delete_manager.tree.view.inherit.dynamic'
+LIST_VIEW_JS_CLASS = 'soft_delete_manager_list_view_with_button'
+
 class SoftDeleteConfigSettings(models.TransientModel):
     _inherit = 'res.config.settings'
 
@@ -15,6 +20,26 @@ class SoftDeleteConfigSettings(models.TransientModel):
         readonly=False
     )
 
+    filter_deleted_records = fields.Boolean(
+        related='config_id.filter_deleted_records',
+        readonly=False
+    )
+
+    cascade_soft_delete = fields.Boolean(
+        related='config_id.cascade_soft_delete',
+        readonly=False
+    )
+
+    online_enablement = fields.Boolean(
+        related='config_id.online_enablement',
+        readonly=False
+    )
+
+    tombstone_on_purge = fields.Boolean(
+        related='config_id.tombstone_on_purge',
+        readonly=False
+    )
+
     config_id = fields.Many2one(
         'soft.delete.manager.config',
         string="Configuration",
@@ -25,296 +50,243 @@ class SoftDeleteConfigSettings(models.TransientModel):
     def set_values(self):
         super().set_values()
         self.ensure_one()
+        timings = {}
+        start = phase_start = time.perf_counter()
+        query_count = self.env.cr.sql_log_count
+
+        def end_phase(phase):
+            nonlocal phase_start
+            now = time.perf_counter()
+            timings[phase] = (now - phase_start) * 1000
+            phase_start = now
+
         previous_model_ids = self.config_id.model_ids.ids
         new_model_ids = self.model_ids.ids
-        _logger.info(f"Saving Soft Delete configuration: previous_model_ids={previous_model_ids}, new_model_ids={new_model_ids}")
+        _logger.debug(f"Saving Soft Delete configuration: previous_model_ids={previous_model_ids}, new_model_ids={new_model_ids}")
 
         self.config_id.write({'model_ids': [(6, 0, new_model_ids)]})
         self._apply_soft_delete(new_model_ids, previous_model_ids)
         self.env.cr.commit()
+        end_phase('config')
 
         IrModel = self.env['ir.model']
         IrUiView = self.env['ir.ui.view']
-        IrModelData = self.env['ir.model.data']
-        IrActionsServer = self.env['ir.actions.server']
-
-        # Remove outdated inherited views
-        existing_views = IrUiView.search([
-            ('inherit_id.model', 'in', [m.model for m in IrModel.search([])]),
-            ('name', '=', 'soft_delete_manager.tree.view.inherit.dynamic')
-        ])
-        existing_views.unlink()
-
-        # Process each model
-        for model in IrModel.browse(new_model_ids):
-            # Add js_class to tree view
-            tree_view = IrUiView.search([
-                ('model', '=', model.model),
-                ('type', '=', 'tree'),
-                ('mode', '=', 'primary')
-            ], limit=1)
-
-            if tree_view:
-                xml_id_record = IrModelData.search([
-                    ('model', '=', 'ir.ui.view'),
-                    ('res_id', '=', tree_view.id)
-                ], limit=1)
-                inherit_id_ref = xml_id_record.complete_name if xml_id_record else False
-
-                # Parse the arch_db string into an XML tree
-                try:
-                    parser = etree.XMLParser(remove_blank_text=True)
-                    tree = etree.fromstring(tree_view.arch_db, parser=parser)
-                    current_js_class_nodes = tree.xpath("//tree/@js_class")
-                    current_js_class = current_js_class_nodes[0] if current_js_class_nodes else ""
-                except etree.ParseError as e:
-                    _logger.error(f"Failed to parse XML for view {tree_view.id} of model {model.model}: {str(e)}")
-                    current_js_class = ""
-
-                new_js_class = current_js_class
-                if "soft_delete_manager_list_view_with_button" not in current_js_class:
-                    if current_js_class:
-                        new_js_class = f"{current_js_class},soft_delete_manager_list_view_with_button"
-                    else:
-                        new_js_class = "soft_delete_manager_list_view_with_button"
-
-                IrUiView.create({
-                    'name': 'soft_delete_manager.tree.view.inherit.dynamic',
-                    'model': model.model,
-                    'type': 'tree',
-                    'inherit_id': tree_view.id,
-                    'mode': 'extension',
-                    'arch': f"""
-                        <xpath expr="//tree" position="attributes">
-                            <attribute name="js_class">{new_js_class}</attribute>
-                        </xpath>
-                    """
-                })
-                _logger.info(f"Added js_class to tree view of model {model.model} (inherit_id: {tree_view.id}, external ref: {inherit_id_ref}, new js_class: {new_js_class})")
-            else:
-                _logger.warning(f"No primary tree view found for model {model.model}")
-
-            # Create wizard model and views
-            wizard_model_name = self._create_dynamic_wizard_model_and_view(model.model)
-
-            # Ensure server action exists
-            self._ensure_server_action(model, wizard_model_name)
-
-        self._apply_domain_to_actions(new_model_ids)
-
-    def _ensure_server_action(self, model, wizard_model_name):
-        """Ensure a server action exists for the given wizard model."""
-        IrActionsServer = self.env['ir.actions.server']
-        wizard_class_name = wizard_model_name.replace('.', '_')
-        action_name = f"Populate {wizard_class_name} Records"
-
-        _logger.debug(f"Checking for server action '{action_name}' for model {model.model}")
-        existing_server_action = IrActionsServer.search([
-            ('name', '=', action_name),
-            ('model_id.model', '=', model.model),
-        ], limit=1)
-
-        if not existing_server_action:
-            IrActionsServer.create({
-                'name': action_name,
-                'model_id': model.id,
-                'state': 'code',
-                'code': f"""
-                    env['soft.delete.manager.config'].populate_wizard_records('{model.model}', '{wizard_model_name}')
-                """,
-            })
-            _logger.info(f"Created server action '{action_name}' for model {model.model}")
-        else:
-            _logger.info(f"Server action '{action_name}' already exists for model {model.model} (ID: {existing_server_action.id})")
 
-    @api.model
-    def ensure_all_server_actions(self):
-        """Ensure server actions exist for all configured models."""
-        config = self._get_or_create_config()
-        IrModel = self.env['ir.model']
-        for model in config.model_ids:
-            wizard_model_name = f"x_{model.model.replace('.', '_')}_wizard"
-            if not IrModel.search([('model', '=', wizard_model_name)], limit=1):
-                _logger.warning(f"Wizard model {wizard_model_name} does not exist, creating it")
-                self._create_dynamic_wizard_model_and_view(model.model)
-            self._ensure_server_action(model, wizard_model_name)
-        _logger.info("Verified server actions for all configured models")
-
-    def _apply_domain_to_actions(self, model_ids):
-        IrModel = self.env['ir.model']
+        # The Recover Deleted view extension marks the models whose views and actions are applied
+        configured_models = IrModel.browse(new_model_ids)
+        configured_names = set(configured_models.mapped('model'))
+        applied_views = IrUiView.search_read([('name', '=', DYNAMIC_VIEW_NAME)], ['model'])
+        applied_names = {view['model'] for view in applied_views}
+        added_models = configured_models.filtered(lambda m: m.model not in applied_names)
+        removed_names = applied_names - configured_names
+        _logger.debug(f"Soft delete models added: {added_models.mapped('model')}, removed: {sorted(removed_names)}")
+        end_phase('diff')
+
+        if removed_names:
+            IrUiView.browse([
+                view['id'] for view in applied_views if view['model'] in removed_names
+            ]).unlink()
+        end_phase('removed')
+
+        # The action domains are set by the enablement, once the x_is_deleted field exists
+        self._add_list_view_button(added_models)
+        end_phase('views')
+
+        duration_ms = (time.perf_counter() - start) * 1000
+        self.env['soft.delete.stats']._record(
+            'settings', self._name, duration_ms, len(added_models) + len(removed_names),
+            self.env.cr.sql_log_count - query_count)
+        breakdown = ", ".join(f"{phase}: {duration:.1f} ms" for phase, duration in timings.items())
+        _logger.info(f"Applied Soft Delete configuration in {duration_ms:.1f} ms, {len(added_models)} models added, "
+                     f"{len(removed_names)} removed ({breakdown})")
+
+    def _add_list_view_button(self, models_to_add):
+        """Extend the primary tree view of the given models with the Recover Deleted button."""
+        if not models_to_add:
+            return
+        IrUiView = self.env['ir.ui.view']
         IrModelData = self.env['ir.model.data']
-        IrActionsActWindow = self.env['ir.actions.act_window']
-
-        for model in IrModel.browse(model_ids):
-            action = IrActionsActWindow.search([
-                ('res_model', '=', model.model),
-                ('view_mode', 'in', ['tree,form', 'form,tree'])
-            ], limit=1)
-
-            if action:
-                action.write({
-                    'domain': "[('x_is_deleted', '=', False)]"
-                })
-                xml_id_record = IrModelData.search([
-                    ('model', '=', 'ir.actions.act_window'),
-                    ('res_id', '=', action.id)
-                ], limit=1)
-                if xml_id_record:
-                    _logger.info(f"Updated domain for action {xml_id_record.module}.{xml_id_record.name} of model {model.model}")
+
+        extended_names = {view['model'] for view in IrUiView.search_read([
+            ('name', '=', DYNAMIC_VIEW_NAME),
+            ('model', 'in', models_to_add.mapped('model')),
+        ], ['model'])}
+        models_to_add = models_to_add.filtered(lambda m: m.model not in extended_names)
+
+        tree_views = {}
+        for view in IrUiView.search_read([
+            ('model', 'in', models_to_add.mapped('model')),
+            ('type', '=', 'tree'),
+            ('mode', '=', 'primary'),
+        ], ['model', 'arch_db'], order='priority, name, id'):
+            tree_views.setdefault(view['model'], view)
+        xml_ids = {
+            data['res_id']: f"{data['module']}.{data['name']}"
+            for data in IrModelData.search_read([
+                ('model', '=', 'ir.ui.view'),
+                ('res_id', 'in', [view['id'] for view in tree_views.values()]),
+            ], ['res_id', 'module', 'name'])
+        }
+
+        vals_list = []
+        for model in models_to_add:
+            tree_view = tree_views.get(model.model)
+            if not tree_view:
+                _logger.warning(f"No primary tree view found for model {model.model}")
+                continue
+
+            # Parse the arch_db string into an XML tree
+            try:
+                parser = etree.XMLParser(remove_blank_text=True)
+                tree = etree.fromstring(tree_view['arch_db'], parser=parser)
+                current_js_class_nodes = tree.xpath("//tree/@js_class")
+                current_js_class = current_js_class_nodes[0] if current_js_class_nodes else ""
+            except etree.ParseError as e:
+                _logger.error(f"Failed to parse XML for view {tree_view['id']} of model {model.model}: {str(e)}")
+                current_js_class = ""
+
+            new_js_class = current_js_class
+            if LIST_VIEW_JS_CLASS not in current_js_class:
+                if current_js_class:
+                    new_js_class = f"{current_js_class},{LIST_VIEW_JS_CLASS}"
                 else:
-                    _logger.info(f"Updated domain for action (no XML ID) of model {model.model}")
-            else:
-                _logger.warning(f"No action found for model {model.model}")
+                    new_js_class = LIST_VIEW_JS_CLASS
+
+            vals_list.append({
+                'name': DYNAMIC_VIEW_NAME,
+                'model': model.model,
+                'type': 'tree',
+                'inherit_id': tree_view['id'],
+                'mode': 'extension',
+                'arch': f"""
+                    <xpath expr="//tree" position="attributes">
+                        <attribute name="js_class">{new_js_class}</attribute>
+                    </xpath>
+                """
+            })
+            _logger.debug(f"Added js_class to tree view of model {model.model} (inherit_id: {tree_view['id']}, external ref: {xml_ids.get(tree_view['id'], False)}, new js_class: {new_js_class})")
+        IrUiView.create(vals_list)
 
     def _apply_soft_delete(self, new_model_ids, previous_model_ids):
         return self.env['soft.delete.manager.config']._apply_soft_delete(new_model_ids, previous_model_ids)
 
+    def action_show_soft_delete_latencies(self):
+        """Report the p50/p95 latencies of the soft delete operations, per model."""
+        return self.env['soft.delete.stats'].action_show_latency_summary()
+
+    def action_check_soft_delete_indexes(self):
+        """Report the size and planner usage of the soft delete indexes of the configured models."""
+        report = self.env['soft.delete.manager.config'].get_soft_delete_index_report()
+        lines = []
+        for entry in report:
+            if not entry['exists']:
+                lines.append(_("%(index)s (%(model)s): missing", index=entry['index'], model=entry['model']))
+                continue
+            lines.append(_(
+                "%(index)s (%(model)s): %(size)s, %(scans)s scans, %(valid)s, %(usage)s",
+                index=entry['index'],
+                model=entry['model'],
+                size=entry['size'],
+                scans=entry['scans'],
+                valid=_("valid") if entry['valid'] else _("invalid"),
+                usage=_("used by the planner") if entry['used_by_planner'] else _("not used by the planner"),
+            ))
+        return {
+            'type': 'ir.actions.client',
+            'tag': 'display_notification',
+            'params': {
+                'title': _("Soft Delete Indexes"),
+                'message': "\n".join(lines) or _("No model is configured for soft delete."),
+                'type': 'info',
+                'sticky': True,
+            },
+        }
+
+    def action_check_table_maintenance(self):
+        """Report the dead rows and the last VACUUM and ANALYZE of the configured tables."""
+        lines = [
+            _(
+                "%(model)s: %(size)s, %(dead)s dead rows (%(ratio)s%%), last vacuum %(vacuum)s, last analyze %(analyze)s%(needs)s",
+                model=entry['model'],
+                size=entry['size'],
+                dead=entry['dead'],
+                ratio=round(entry['dead_ratio'] * 100, 1),
+                vacuum=entry['last_vacuum'] and fields.Datetime.to_string(entry['last_vacuum']) or _("never"),
+                analyze=entry['last_analyze'] and fields.Datetime.to_string(entry['last_analyze']) or _("never"),
+                needs=_(", %s pending", entry['needs'].upper()) if entry['needs'] else "",
+            )
+            for entry in self.env['soft.delete.manager.config'].get_table_maintenance_report()
+        ]
+        return {
+            'type': 'ir.actions.client',
+            'tag': 'display_notification',
+            'params': {
+                'title': _("Soft Delete Table Bloat"),
+                'message': "\n".join(lines) or _("No table statistics are available yet."),
+                'type': 'info',
+                'sticky': True,
+            },
+        }
+
+    def action_run_table_maintenance(self):
+        """Run the table maintenance cron now, in the background."""
+        self.env.ref('soft_delete_manager.ir_cron_soft_delete_maintenance')._trigger()
+
     @api.model
     def get_values(self):
         res = super(SoftDeleteConfigSettings, self).get_values()
         config = self._get_or_create_config()
-        self.ensure_all_server_actions()
+        state = self.env['soft.delete.manager.config']._get_config_values(config.id)
         res['config_id'] = config.id
-        res['model_ids'] = [(6, 0, config.model_ids.ids)]
+        res['model_ids'] = [(6, 0, list(state['model_ids']))]
+        res['filter_deleted_records'] = state['filter_deleted_records']
+        res['cascade_soft_delete'] = state['cascade_soft_delete']
+        res['tombstone_on_purge'] = state['tombstone_on_purge']
+        res['online_enablement'] = state['online_enablement']
         return res
 
     @api.model
     def _get_or_create_config(self):
-        config = self.env['soft.delete.manager.config'].search([], limit=1)
-        if not config:
-            config = self.env['soft.delete.manager.config'].create({})
-        return config
+        Config = self.env['soft.delete.manager.config']
+        config_id = Config._get_config_id()
+        if not config_id:
+            return Config.create({})
+        return Config.browse(config_id)
 
-    def _create_dynamic_wizard_model_and_view(self, model_name):
-        IrModel = self.env['ir.model']
-        IrModelFields = self.env['ir.model.fields']
-        IrUiView = self.env['ir.ui.view']
-        IrActionsServer = self.env['ir.actions.server']
-
-        wizard_model_name = f"x_{model_name.replace('.', '_')}_wizard"
-        wizard_class_name = wizard_model_name.replace('.', '_')
-
-        existing_model = IrModel.search([('model', '=', wizard_model_name)], limit=1)
-        if existing_model:
-            _logger.info(f"Wizard model {wizard_model_name} already exists.")
-            return wizard_model_name
-
-        wizard_model = IrModel.create({
-            'name': wizard_class_name,
-            'model': wizard_model_name,
-            'state': 'manual'
-        })
-
-        for field_data in [
-            {
-                'name': 'x_model_id',
-                'field_description': 'Screen Name',
-                'ttype': 'many2one',
-                'relation': 'ir.model',
-                'domain': "[('model', '!=', False)]",
-                'readonly': True,
-            },
-            {
-                'name': 'x_record_id',
-                'field_description': 'Original Record ID',
-                'ttype': 'integer',
-                'readonly': True,
-            },
-            {
-                'name': 'x_display_name',
-                'field_description': 'Name',
-                'ttype': 'char',
-                'readonly': True,
+    @api.model
+    def repair_soft_delete_configuration(self):
+        """Recreate the missing fields and views of the configured models and queue their missing indexes.
+
+        Runs from the Repair button of the settings and from the module upgrade, never on page load.
+        The indexes are built concurrently by the enablement cron, outside of this transaction.
+        """
+        Config = self.env['soft.delete.manager.config']
+        config = self._get_or_create_config()
+        self._add_list_view_button(config.model_ids.filtered(lambda m: m.model in self.env))
+        config._sync_model_settings()
+        for model in config.model_ids:
+            if model.model in self.env:
+                Config._ensure_deleted_at_field(model)
+                Config._backfill_deleted_at(model.model)
+        unindexed = config.model_setting_ids.filtered(
+            lambda setting: setting.enable_state == 'ready' and setting.model in self.env
+            and not Config._has_soft_delete_indexes(setting.model)
+        )
+        if unindexed:
+            _logger.info(f"Queueing the soft delete indexes of {unindexed.mapped('model')}")
+            unindexed.write({'enable_state': 'indexing', 'enable_error': False, 'enable_attempts': 0})
+            self.env.ref('soft_delete_manager.ir_cron_soft_delete_enable')._trigger()
+        _logger.info("Repaired Soft Delete configuration")
+
+    def action_repair_soft_delete(self):
+        self.repair_soft_delete_configuration()
+        return {
+            'type': 'ir.actions.client',
+            'tag': 'display_notification',
+            'params': {
+                'title': _("Soft Delete Manager"),
+                'message': _("Fields and views of the configured models have been verified, missing indexes are built in the background."),
+                'type': 'success',
+                'sticky': False,
             },
-        ]:
-            existing_field = IrModelFields.search([
-                ('model', '=', wizard_model_name),
-                ('name', '=', field_data['name'])
-            ], limit=1)
-            if not existing_field:
-                field_data.update({
-                    'model_id': wizard_model.id,
-                    'model': wizard_model_name,
-                    'state': 'manual',
-                })
-                IrModelFields.create(field_data)
-                _logger.info(f"Created field '{field_data['name']}' for model: {wizard_model_name}")
-            else:
-                _logger.info(f"Field '{field_data['name']}' already exists for model: {wizard_model_name}")
-
-        IrUiView.create({
-            'name': f'{wizard_model_name}.form',
-            'model': wizard_model_name,
-            'arch': f'''
-                <form string="{wizard_class_name}">
-                    <sheet>
-                        <group>
-                            <field name="x_model_id"/>
-                            <field name="x_record_id"/>
-                            <field name="x_display_name"/>
-                        </group>
-                    </sheet>
-                </form>
-            ''',
-            'type': 'form'
-        })
-
-        restore_action_name = f"Restore {wizard_class_name} Records"
-        existing_restore_action = IrActionsServer.search([
-            ('name', '=', restore_action_name),
-            ('model_id.model', '=', wizard_model_name),
-        ], limit=1)
-
-        if not existing_restore_action:
-            restore_action = IrActionsServer.create({
-                'name': restore_action_name,
-                'model_id': wizard_model.id,
-                'state': 'code',
-                'code': f"""
-                    env['soft.delete.manager.config'].restore_records('{model_name}', records.mapped('x_record_id'))
-                """,
-            })
-            _logger.info(f"Created restore server action '{restore_action_name}' for wizard {wizard_model_name}")
-        else:
-            restore_action = existing_restore_action
-            _logger.info(f"Using existing restore server action '{restore_action_name}' for wizard {wizard_model_name}")
-
-        delete_action_name = f"Permanent Delete {wizard_class_name} Records"
-        existing_delete_action = IrActionsServer.search([
-            ('name', '=', delete_action_name),
-            ('model_id.model', '=', wizard_model_name),
-        ], limit=1)
-
-        if not existing_delete_action:
-            delete_action = IrActionsServer.create({
-                'name': delete_action_name,
-                'model_id': wizard_model.id,
-                'state': 'code',
-                'code': f"""
-                    env['soft.delete.manager.config'].permanent_delete_records('{model_name}', records.mapped('x_record_id'))
-                """,
-            })
-            _logger.info(f"Created permanent delete server action '{delete_action_name}' for wizard {wizard_model_name}")
-        else:
-            delete_action = existing_delete_action
-            _logger.info(f"Using existing permanent delete server action '{delete_action_name}' for wizard {wizard_model_name}")
-
-        IrUiView.create({
-            'name': f'{wizard_model_name}.tree',
-            'model': wizard_model_name,
-            'arch': f'''
-                <tree string="{wizard_class_name}" create="false" edit="false" delete="false">
-                    <header>
-                        <button name="{restore_action.id}" string="Restore" type="action" icon="fa-undo" confirm="Are you sure you want to restore the selected records?"/>
-                        <button name="{delete_action.id}" string="Permanent Delete" type="action" icon="fa-trash" confirm="Are you sure you want to permanently delete the selected records?"/>
-                    </header>
-                    <field name="x_model_id"/>
-                    <field name="x_record_id" invisible="1"/>
-                    <field name="x_display_name"/>
-                </tree>
-            ''',
-            'type': 'tree'
-        })
-
-        _logger.info(f"Created wizard and views for model: {wizard_model_name}")
-        return wizard_model_name
\ No newline at end of file
+        }
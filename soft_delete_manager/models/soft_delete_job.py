@@ -0,0 +1,150 @@
+from odoo import models, fields, api, _
+import json
+import logging
+import time
+
+_logger = logging.getLogger(__name__)
+
+# Default number of selected records above which a restore or purge runs as a background job
+JOB_THRESHOLD = 5000
+
+# Default number of records processed per committed chunk by the job worker
+JOB_CHUNK_SIZE = 1000
+
+# Default time budget in seconds of one job worker run before it reschedules itself
+JOB_TIME_BUDGET = 300
+
+
+class SoftDeleteJob(models.Model):
+    """Restore or permanent delete of a large selection, processed in chunks by a cron worker.
+
+    The selected ids are stored on the job and the number of processed ids is committed
+    with every chunk, so a job interrupted by a timeout or a restart resumes where it stopped.
+    """
+    _name = 'soft.delete.job'
+    _description = 'Soft Delete Background Job'
+    _order = 'id desc'
+
+    name = fields.Char(string="Job", required=True, readonly=True)
+    res_model = fields.Char(string="Model", required=True, readonly=True)
+    operation = fields.Selection([
+        ('restore', 'Restore'),
+        ('purge', 'Permanent Delete'),
+    ], string="Operation", required=True, readonly=True)
+    state = fields.Selection([
+        ('queued', 'Queued'),
+        ('running', 'Running'),
+        ('done', 'Done'),
+        ('failed', 'Failed'),
+    ], string="Status", default='queued', required=True, readonly=True)
+    user_id = fields.Many2one('res.users', string="Requested By", required=True, readonly=True, default=lambda self: self.env.user)
+    record_ids = fields.Text(string="Record IDs", required=True, readonly=True, help="JSON list of the selected record ids.")
+    total_count = fields.Integer(string="Records", readonly=True)
+    processed_count = fields.Integer(string="Processed", readonly=True)
+    progress = fields.Float(string="Progress", compute='_compute_progress')
+    date_start = fields.Datetime(string="Started On", readonly=True)
+    date_done = fields.Datetime(string="Finished On", readonly=True)
+    error_message = fields.Text(string="Error", readonly=True)
+    conflict_count = fields.Integer(string="Conflicts", readonly=True, help="Records not restored because of a unique constraint, or not deleted because other records reference them.")
+    conflict_report = fields.Text(string="Conflict Report", readonly=True)
+
+    @api.depends('processed_count', 'total_count')
+    def _compute_progress(self):
+        for job in self:
+            job.progress = 100.0 * job.processed_count / job.total_count if job.total_count else 100.0
+
+    @api.model
+    def _should_queue(self, record_ids):
+        """Return whether an operation on ``record_ids`` is too large to run in the request."""
+        threshold = int(self.env['ir.config_parameter'].sudo().get_param('soft_delete_manager.job_threshold', JOB_THRESHOLD))
+        return len(record_ids) > threshold
+
+    @api.model
+    def _enqueue(self, operation, model_name, record_ids):
+        """Queue a restore or permanent delete of ``record_ids`` and wake up the job worker."""
+        record_ids = sorted(set(record_ids))
+        job = self.sudo().create({
+            'name': _("%(operation)s %(count)s %(model)s records",
+                      operation=dict(self._fields['operation']._description_selection(self.env))[operation],
+                      count=len(record_ids), model=model_name),
+            'res_model': model_name,
+            'operation': operation,
+            'user_id': self.env.user.id,
+            'record_ids': json.dumps(record_ids),
+            'total_count': len(record_ids),
+        })
+        self.env.ref('soft_delete_manager.ir_cron_soft_delete_jobs')._trigger()
+        _logger.info(f"Queued job {job.id}: {operation} of {job.total_count} records in model {model_name}")
+        return job
+
+    def action_view_jobs(self):
+        """Open the given jobs so their progress can be followed."""
+        action = self.env['ir.actions.act_window']._for_xml_id('soft_delete_manager.action_soft_delete_job')
+        if len(self) == 1:
+            action.update({'views': [(False, 'form')], 'res_id': self.id})
+        else:
+            action['domain'] = [('id', 'in', self.ids)]
+        return action
+
+    def action_retry(self):
+        self.filtered(lambda job: job.state == 'failed').write({'state': 'queued', 'error_message': False})
+        self.env.ref('soft_delete_manager.ir_cron_soft_delete_jobs')._trigger()
+
+    @api.model
+    def _cron_process_jobs(self):
+        """Process queued and interrupted jobs chunk by chunk, within the configured time budget."""
+        ICP = self.env['ir.config_parameter'].sudo()
+        chunk_size = int(ICP.get_param('soft_delete_manager.job_chunk_size', JOB_CHUNK_SIZE))
+        deadline = time.monotonic() + float(ICP.get_param('soft_delete_manager.job_time_budget', JOB_TIME_BUDGET))
+        auto_commit = not self.env['soft.delete.manager.config']._in_test_transaction()
+
+        for job in self.search([('state', 'in', ('queued', 'running'))], order='id'):
+            if not job._process(chunk_size, deadline, auto_commit):
+                _logger.info(f"Job time budget exhausted during job {job.id}, rescheduling")
+                self.env.ref('soft_delete_manager.ir_cron_soft_delete_jobs')._trigger()
+                return
+
+    def _add_conflicts(self, lines):
+        """Append the records the job could not process to its conflict report."""
+        if lines:
+            self.write({
+                'conflict_count': self.conflict_count + len(lines),
+                'conflict_report': "\n".join(filter(None, [self.conflict_report] + lines)),
+            })
+
+    def _process(self, chunk_size, deadline, auto_commit):
+        """Process the remaining chunks of the job. Returns False when the time budget ran out."""
+        self.ensure_one()
+        record_ids = json.loads(self.record_ids)
+        if self.state == 'queued':
+            self.write({'state': 'running', 'date_start': fields.Datetime.now()})
+        config = self.env['soft.delete.manager.config'].with_user(self.user_id)
+
+        while self.processed_count < len(record_ids):
+            if time.monotonic() >= deadline:
+                return False
+            chunk = record_ids[self.processed_count:self.processed_count + chunk_size]
+            try:
+                with self.env.cr.savepoint():
+                    existing_ids = config.env[self.res_model].browse(chunk).exists().ids
+                    if existing_ids and self.operation == 'restore':
+                        conflicts = config.restore_records(self.res_model, existing_ids)['conflicts']
+                        self._add_conflicts([f"{conflict['id']}: {conflict['message']}" for conflict in conflicts])
+                    elif existing_ids:
+                        blocked_ids = config.permanent_delete_records(self.res_model, existing_ids)['blocked']
+                        self._add_conflicts([f"{record_id}: {_('still referenced by other records')}" for record_id in blocked_ids])
+            except Exception as e:
+                _logger.error(f"Job {self.id} failed after {self.processed_count} records: {str(e)}")
+                self.write({'state': 'failed', 'error_message': str(e)})
+                if auto_commit:
+                    self.env.cr.commit()
+                return True
+            self.processed_count += len(chunk)
+            if auto_commit:
+                self.env.cr.commit()
+
+        self.write({'state': 'done', 'date_done': fields.Datetime.now()})
+        _logger.info(f"Job {self.id} done: {self.operation} of {self.total_count} records in model {self.res_model}")
+        if auto_commit:
+            self.env.cr.commit()
+        return True
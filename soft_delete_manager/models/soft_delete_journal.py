@@ -0,0 +1,101 @@
+from odoo import models, fields, api, _
+from odoo.exceptions import UserError
+import logging
+
+_logger = logging.getLogger(__name__)
+
+# Default number of days journal entries are kept, 0 keeps them forever
+JOURNAL_RETENTION_DAYS = 365
+
+# Number of expired journal entries removed per committed chunk
+JOURNAL_PURGE_CHUNK_SIZE = 10000
+
+
+class SoftDeleteJournal(models.Model):
+    """Append-only journal of soft delete, restore and purge operations.
+
+    Entries are written with a single INSERT per batch operation and keep the ids of the
+    batch in an ``int4[]`` column, so logging a delete of thousands of records adds one row.
+    """
+    _name = 'soft.delete.journal'
+    _description = 'Soft Delete Journal'
+    _order = 'date desc, id desc'
+    _rec_name = 'res_model'
+
+    date = fields.Datetime(string="Date", required=True, readonly=True)
+    res_model = fields.Char(string="Model", required=True, readonly=True)
+    operation = fields.Selection([
+        ('soft_delete', 'Soft Delete'),
+        ('restore', 'Restore'),
+        ('purge', 'Permanent Delete'),
+        ('unpurge', 'Restore From Tombstone'),
+    ], string="Operation", required=True, readonly=True)
+    user_id = fields.Many2one('res.users', string="User", readonly=True)
+    record_count = fields.Integer(string="Records", readonly=True)
+    record_ids_display = fields.Text(string="Record IDs", compute='_compute_record_ids_display')
+
+    def init(self):
+        # The ids are kept in an array column the ORM does not manage
+        self.env.cr.execute("ALTER TABLE soft_delete_journal ADD COLUMN IF NOT EXISTS record_ids int4[]")
+        self.env.cr.execute("""
+            CREATE INDEX IF NOT EXISTS soft_delete_journal_user_date_idx
+            ON soft_delete_journal (user_id, date DESC)
+        """)
+        self.env.cr.execute("""
+            CREATE INDEX IF NOT EXISTS soft_delete_journal_model_date_idx
+            ON soft_delete_journal (res_model, date DESC)
+        """)
+        self.env.cr.execute("""
+            CREATE INDEX IF NOT EXISTS soft_delete_journal_date_idx
+            ON soft_delete_journal (date)
+        """)
+
+    def _compute_record_ids_display(self):
+        record_ids = self._get_record_ids()
+        for entry in self:
+            entry.record_ids_display = ", ".join(map(str, record_ids.get(entry.id, [])))
+
+    def _get_record_ids(self):
+        """Return the journaled record ids of the entries, by entry id."""
+        if not self.ids:
+            return {}
+        self.env.cr.execute("SELECT id, record_ids FROM soft_delete_journal WHERE id = ANY(%s)", (list(self.ids),))
+        return {entry_id: record_ids or [] for entry_id, record_ids in self.env.cr.fetchall()}
+
+    @api.model
+    def _log(self, operation, model_name, record_ids):
+        """Append one journal entry for a batch operation on ``record_ids``."""
+        if not record_ids:
+            return
+        now = fields.Datetime.now()
+        uid = self.env.uid
+        self.env.cr.execute("""
+            INSERT INTO soft_delete_journal
+                (date, res_model, operation, user_id, record_count, record_ids,
+                 create_uid, create_date, write_uid, write_date)
+            VALUES (%s, %s, %s, %s, %s, %s::int4[], %s, %s, %s, %s)
+        """, (now, model_name, operation, uid, len(record_ids), list(record_ids), uid, now, uid, now))
+
+    @api.model_create_multi
+    def create(self, vals_list):
+        raise UserError(_("Journal entries are written by soft delete operations only."))
+
+    def write(self, vals):
+        raise UserError(_("Journal entries cannot be modified."))
+
+    def unlink(self):
+        raise UserError(_("Journal entries are removed by their retention policy only."))
+
+    @api.model
+    def _cron_purge_journal(self):
+        """Remove the journal entries older than ``soft_delete_manager.journal_retention_days``."""
+        retention_days = int(self.env['ir.config_parameter'].sudo().get_param(
+            'soft_delete_manager.journal_retention_days', JOURNAL_RETENTION_DAYS))
+        if retention_days <= 0:
+            return
+        cutoff = fields.Datetime.subtract(fields.Datetime.now(), days=retention_days)
+        purged_count = self.env['soft.delete.manager.config']._delete_expired_rows(
+            self._table, cutoff, JOURNAL_PURGE_CHUNK_SIZE)
+        self.invalidate_model()
+        if purged_count:
+            _logger.info(f"Purged {purged_count} journal entries older than {retention_days} days")
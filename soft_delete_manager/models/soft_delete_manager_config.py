@@ -1,47 +1,354 @@
-from odoo import models, fields, api, _
-from odoo.exceptions import ValidationError
+from odoo import models, fields, api, _, SUPERUSER_ID
+from odoo.exceptions import UserError, ValidationError
+from odoo.osv import expression
+from odoo.tools import frozendict, ormcache
+from contextlib import contextmanager
+from datetime import timedelta
+import csv
+import hashlib
+import io
+import json
 import logging
+import threading
 import time
 import psycopg2
+from psycopg2 import errorcodes
 
 _logger = logging.getLogger(__name__)
 
+# Default thresholds of the table maintenance: share of dead rows that triggers a VACUUM, share of
+# rows modified since the last analyze that triggers an ANALYZE, and rows below which a table is skipped
+MAINTENANCE_VACUUM_RATIO = 0.2
+MAINTENANCE_ANALYZE_RATIO = 0.1
+MAINTENANCE_MIN_ROWS = 1000
+
+# Lock timeout of the maintenance commands, which skip locked tables anyway
+MAINTENANCE_LOCK_TIMEOUT = '1s'
+
+# Tables of the module churned by soft delete operations, maintained with the configured tables
+MAINTAINED_MODULE_TABLES = ('soft_delete_journal', 'soft_delete_tombstone', 'soft_delete_job')
+
+# Number of rows updated or deleted by one operation after which the table maintenance is triggered
+MAINTENANCE_TRIGGER_ROWS = 10000
+
+# Partial indexes maintained on every soft-delete enabled table: name suffix -> (columns, predicate, domain).
+# Each predicate is written as the ORM compiles the domain, which PostgreSQL must match to use the index
+SOFT_DELETE_INDEXES = {
+    'x_is_deleted_idx': ('id', 'x_is_deleted', [('x_is_deleted', '=', True)]),
+    'x_not_deleted_idx': ('id', '(x_is_deleted IS NULL OR x_is_deleted = false)', [('x_is_deleted', '=', False)]),
+    'x_deleted_at_idx': ('x_deleted_at, id', 'x_is_deleted', [('x_is_deleted', '=', True)]),
+}
+
+# Class attributes set on a model class when its unlink is patched
+PATCHED_ATTRIBUTES = (
+    'unlink', '_search', '_read_group_raw',
+    'unlink_original', '_search_original', '_read_group_raw_original',
+    '_soft_delete_patched',
+)
+
+# Default number of records hard-deleted per committed chunk by the retention purge
+PURGE_CHUNK_SIZE = 1000
+
+# Default time budget in seconds of one retention purge run before it reschedules itself
+PURGE_TIME_BUDGET = 300
+
+# How long dropping an index concurrently may wait for a lock before falling back to a plain drop
+INDEX_LOCK_TIMEOUT = '5s'
+
+# Advisory lock held while the enablement indexes are built, so that a single thread builds them
+ENABLE_INDEX_LOCK = 'soft_delete_manager.enable_indexes'
+
+# How long the column DDL of the enablement may wait for the table lock on each attempt
+ENABLE_LOCK_TIMEOUT = '2s'
+
+# Attempts to take the table lock per enablement run, waiting one more second after each failure
+ENABLE_LOCK_ATTEMPTS = 5
+
+# Failed enablement runs after which a model waits for the Retry button
+ENABLE_MAX_ATTEMPTS = 10
+
+# Seconds during which a deleted records count is served from the cache
+DELETED_COUNT_TTL = 30
+
+# Tables with more rows than this get an estimated deleted records count instead of an exact one
+DELETED_COUNT_ESTIMATE_THRESHOLD = 1000000
+
+# Number of rows fetched per round trip from the server-side cursor of an export
+EXPORT_BATCH_SIZE = 2000
+
+# Foreign key actions of pg_constraint.confdeltype, by code
+FOREIGN_KEY_ACTIONS = {
+    'a': 'no action',
+    'r': 'restrict',
+    'c': 'cascade',
+    'n': 'set null',
+    'd': 'set default',
+}
+
+# Foreign key actions that make a delete of a referenced row fail
+BLOCKING_FOREIGN_KEY_ACTIONS = ('no action', 'restrict')
+
+# Deleted records counts per (database, model): (expiry, count, estimated)
+_deleted_count_cache = {}
+
+
+def _soft_delete_index_name(table_name, suffix):
+    """Return the name of a soft delete index, kept within PostgreSQL's 63 characters limit."""
+    index_name = f"{table_name}_{suffix}"
+    if len(index_name) > 63:
+        digest = hashlib.sha1(table_name.encode()).hexdigest()[:8]
+        index_name = f"{table_name[:63 - len(suffix) - 10]}_{digest}_{suffix}"
+    return index_name
+
+
+def _exclude_deleted_domain(domain):
+    """Restrict ``domain`` to records that are not soft-deleted, unless it already filters on x_is_deleted."""
+    domain = list(domain or [])
+    if any(expression.is_leaf(leaf) and leaf[0] == 'x_is_deleted' for leaf in domain):
+        return domain
+    return expression.AND([domain, [('x_is_deleted', '=', False)]])
+
+
 class SoftDeleteManagerConfig(models.Model):
     _name = 'soft.delete.manager.config'
     _description = 'Soft Delete Manager Configuration'
 
     model_ids = fields.Many2many('ir.model', string="Model Names", domain="[('model', '!=', False)]")
+    filter_deleted_records = fields.Boolean(
+        string="Hide Deleted Records Everywhere",
+        help="Exclude soft-deleted records from every search and grouped read of the configured models, "
+             "not only from their list views. Use the include_deleted context key to bypass the filter.")
+    cascade_soft_delete = fields.Boolean(
+        string="Cascade Soft Delete",
+        help="Soft delete the one2many children of a deleted record when the child model is configured "
+             "for soft delete too, and restore them together with their parent.")
+    online_enablement = fields.Boolean(
+        string="Online Enablement",
+        help="Enable soft delete on newly selected models in the background: the columns are added with "
+             "a short lock timeout and retries, and the indexes are built concurrently, so that saving the "
+             "settings never waits for a lock on a large table.")
+    tombstone_on_purge = fields.Boolean(
+        string="Keep Tombstones of Purged Records",
+        help="Copy the column values of permanently deleted records into restorable tombstones, "
+             "removed after soft_delete_manager.tombstone_retention_days days.")
+    model_setting_ids = fields.One2many('soft.delete.manager.model', 'config_id', string="Per-Model Settings")
+
+    @api.model_create_multi
+    def create(self, vals_list):
+        records = super(SoftDeleteManagerConfig, self).create(vals_list)
+        self.clear_caches()
+        return records
 
     def write(self, vals):
         """Override write to add x_is_deleted field and apply custom unlink method to newly selected models."""
         previous_model_ids = self.model_ids.ids
         res = super(SoftDeleteManagerConfig, self).write(vals)
+        self.clear_caches()
         if 'model_ids' in vals:
             new_model_ids = self.model_ids.ids
+            self._sync_model_settings()
             self._apply_soft_delete(new_model_ids, previous_model_ids)
             self._apply_custom_unlink(new_model_ids)
+            removed_models = self.env['ir.model'].browse(set(previous_model_ids) - set(new_model_ids))
+            for model in removed_models:
+                self._drop_soft_delete_indexes(model.model)
+                self._unpatch_unlink_method(model.model)
+            if set(new_model_ids) != set(previous_model_ids):
+                # Other workers reload their registry, which patches them again in _register_hook
+                self.pool.registry_invalidated = True
         return res
 
+    def _sync_model_settings(self):
+        """Keep one per-model settings line for every configured model."""
+        for config in self:
+            configured_ids = set(config.model_ids.ids)
+            config.model_setting_ids.filtered(lambda s: s.model_id.id not in configured_ids).unlink()
+            missing_ids = configured_ids - set(config.model_setting_ids.model_id.ids)
+            self.env['soft.delete.manager.model'].create([
+                {'config_id': config.id, 'model_id': model_id} for model_id in missing_ids
+            ])
+
+    def _register_hook(self):
+        """Patch the configured models whenever the registry is loaded, in every worker."""
+        super()._register_hook()
+        start = time.perf_counter()
+        model_names = [name for name in self._get_configured_model_names() if name in self.env]
+        for model_name in model_names:
+            self._patch_unlink_method(model_name)
+        _logger.info(f"Patched {len(model_names)} soft delete models in {(time.perf_counter() - start) * 1000:.1f} ms")
+
+    def _unregister_hook(self):
+        """Remove the patches before the registry classes are set up again."""
+        for model_name, model_cls in self.pool.models.items():
+            if model_cls.__dict__.get('_soft_delete_patched'):
+                self._unpatch_unlink_method(model_name)
+        super()._unregister_hook()
+
+    @api.model
+    def _get_configured_model_names(self):
+        """Return the names of the models configured for soft delete, in a single query."""
+        field = self._fields['model_ids']
+        self.env.cr.execute(f"""
+            SELECT DISTINCT m.model
+            FROM ir_model m
+            JOIN "{field.relation}" rel ON rel."{field.column2}" = m.id
+        """)
+        return [row[0] for row in self.env.cr.fetchall()]
+
     def _apply_soft_delete(self, new_model_ids, previous_model_ids):
-        """Add x_is_deleted field to newly selected models and apply action domain."""
-        IrModel = self.env['ir.model']
-        IrModelFields = self.env['ir.model.fields']
-        new_models = IrModel.browse(new_model_ids).filtered(lambda m: m.id not in previous_model_ids)
+        """Enable soft delete on the newly selected models.
 
-        _logger.info(f"🔧 Applying soft delete to {len(new_models)} models: {[m.model for m in new_models]}")
+        The columns and fields are added in the transaction of the save, unless online enablement
+        is on, and the indexes are always left to the enablement cron, which runs once the save
+        is committed.
+        """
+        new_ids = set(new_model_ids) - set(previous_model_ids)
+        settings = self.env['soft.delete.manager.model'].search([('model_id', 'in', list(new_ids))])
+        if not settings:
+            return
+        _logger.info(f"🔧 Applying soft delete to {len(settings)} models: {settings.mapped('model')}")
+        settings.write({'enable_state': 'pending', 'enable_error': False, 'enable_attempts': 0})
+        if not self._get_config_state()['online_enablement']:
+            for setting in settings:
+                self._enable_model(setting, until='indexing', in_transaction=True)
+        self.env.ref('soft_delete_manager.ir_cron_soft_delete_enable')._trigger()
 
-        for model in new_models:
-            # Check if field already exists
-            existing_field = IrModelFields.search([
-                ('model', '=', model.model),
-                ('name', '=', 'x_is_deleted')
-            ], limit=1)
+    def _enable_model(self, setting, until='ready', auto_commit=False, in_transaction=False):
+        """Run the remaining enablement steps of a model, up to the ``until`` state.
 
-            if existing_field:
-                _logger.warning(f"⚠️ x_is_deleted field already exists in model {model.model}, skipping.")
+        Every step is idempotent and the state is saved after each of them, so an interrupted
+        enablement resumes at the step it stopped at. With ``in_transaction`` the columns are
+        added in the current transaction. Returns False if a step failed.
+        """
+        steps = [
+            ('pending', 'columns', lambda: self._add_soft_delete_columns(setting.model, in_transaction)),
+            ('columns', 'indexing', lambda: self._create_soft_delete_fields(setting.model_id)),
+            ('indexing', 'ready', lambda: self._create_soft_delete_indexes(setting.model, allow_blocking=False)),
+        ]
+        for state, next_state, run_step in steps:
+            if setting.enable_state != state or state == until:
                 continue
+            try:
+                with self.env.cr.savepoint():
+                    run_step()
+                    setting.write({'enable_state': next_state, 'enable_error': False})
+                _logger.info(f"Soft delete enablement of {setting.model}: {next_state}")
+            except Exception as e:
+                _logger.error(f"Soft delete enablement of {setting.model} failed at step {state}: {str(e)}")
+                setting.write({'enable_error': str(e), 'enable_attempts': setting.enable_attempts + 1})
+                if auto_commit:
+                    self.env.cr.commit()
+                return False
+            if auto_commit:
+                self.env.cr.commit()
+        return True
 
-            # Create x_is_deleted field
+    @api.model
+    def _cron_enable_models(self):
+        """Finish the enablement of the models that are not ready yet, one step and commit at a time.
+
+        The indexes are built concurrently, which waits for every older transaction, including the
+        one ir.cron keeps its job lock in until the job returns. They are therefore built by a
+        thread started by the job, which proceeds once the transactions of the job are over.
+        """
+        in_test = self._in_test_transaction()
+        settings = self.env['soft.delete.manager.model'].search([
+            ('enable_state', '!=', 'ready'),
+            ('enable_attempts', '<', ENABLE_MAX_ATTEMPTS),
+        ])
+        for setting in settings:
+            if setting.model in self.env:
+                self._enable_model(setting, until='ready' if in_test else 'indexing', auto_commit=not in_test)
+        if not in_test and any(setting.enable_state == 'indexing' for setting in settings):
+            threading.Thread(
+                target=type(self)._build_pending_indexes, args=(self.pool,),
+                name='soft_delete_enable_indexes', daemon=True,
+            ).start()
+
+    @classmethod
+    def _build_pending_indexes(cls, registry):
+        """Build the indexes of the models waiting for them, without keeping a transaction open.
+
+        Nothing is read or written between the commits and the concurrent builds, so that the
+        builds, which run from cursors of their own, never wait for this thread.
+
+        The thread does not outlive its worker: a cron worker serving several databases closes
+        their connection pools between jobs, and a recycled worker stops with its daemon threads,
+        either of which aborts a build. Each attempt is therefore counted before its build starts
+        and only taken back once the build succeeds, so that a build killed repeatedly stops being
+        retried after ENABLE_MAX_ATTEMPTS like a failing one and waits for the Retry button.
+        """
+        try:
+            with registry.cursor() as cr:
+                env = api.Environment(cr, SUPERUSER_ID, {})
+                cr.execute("SELECT pg_try_advisory_lock(hashtext(%s))", (ENABLE_INDEX_LOCK,))
+                if not cr.fetchone()[0]:
+                    return
+                try:
+                    settings = env['soft.delete.manager.model'].search([
+                        ('enable_state', '=', 'indexing'),
+                        ('enable_attempts', '<', ENABLE_MAX_ATTEMPTS),
+                    ])
+                    pending = [(setting.id, setting.model, setting.enable_attempts) for setting in settings if setting.model in env]
+                    cr.commit()
+                    config = env['soft.delete.manager.config']
+                    for setting_id, model_name, attempts in pending:
+                        setting = env['soft.delete.manager.model'].browse(setting_id)
+                        setting.write({
+                            'enable_error': "Index build interrupted before completion",
+                            'enable_attempts': attempts + 1,
+                        })
+                        cr.commit()
+                        try:
+                            config._create_soft_delete_indexes(model_name, allow_blocking=False)
+                            vals = {'enable_state': 'ready', 'enable_error': False, 'enable_attempts': attempts}
+                            _logger.info(f"Soft delete enablement of {model_name}: ready")
+                        except Exception as e:
+                            _logger.error(f"Soft delete enablement of {model_name} failed at step indexing: {str(e)}")
+                            vals = {'enable_error': str(e)}
+                        setting.write(vals)
+                        cr.commit()
+                finally:
+                    cr.execute("SELECT pg_advisory_unlock(hashtext(%s))", (ENABLE_INDEX_LOCK,))
+                    cr.commit()
+        except Exception as e:
+            _logger.error(f"Failed to build the soft delete indexes: {str(e)}")
+
+    def _add_soft_delete_columns(self, model_name, in_transaction=False):
+        """Add the soft delete columns to the table of the model without rewriting it.
+
+        The ALTER TABLE runs from an autocommit cursor with a short lock timeout, retried a few
+        times, so that it never queues active transactions behind it for long. With
+        ``in_transaction`` it runs in the current transaction instead, which may already hold a
+        lock on the table that a separate cursor would wait for. A constant default is stored in
+        the catalog, existing rows are not rewritten.
+        """
+        table_name = self._get_table_name(model_name)
+        ddl = f"""
+            ALTER TABLE "{table_name}"
+            ADD COLUMN IF NOT EXISTS x_is_deleted BOOLEAN DEFAULT FALSE,
+            ALTER COLUMN x_is_deleted SET DEFAULT FALSE,
+            ADD COLUMN IF NOT EXISTS x_deleted_at TIMESTAMP
+        """
+        if in_transaction or self._in_test_transaction():
+            self.env.cr.execute(ddl)
+            return
+        for attempt in range(1, ENABLE_LOCK_ATTEMPTS + 1):
+            try:
+                with self._autocommit_cursor(lock_timeout=ENABLE_LOCK_TIMEOUT) as cr:
+                    cr.execute(ddl)
+                _logger.info(f"🗃️ Added soft delete columns to table {table_name}")
+                return
+            except psycopg2.OperationalError as e:
+                if e.pgcode != errorcodes.LOCK_NOT_AVAILABLE or attempt == ENABLE_LOCK_ATTEMPTS:
+                    raise
+                _logger.info(f"Table {table_name} is locked, retrying in {attempt} s")
+                time.sleep(attempt)
+
+    def _create_soft_delete_fields(self, model):
+        """Create the x_is_deleted and x_deleted_at fields on the existing columns and hide deleted records."""
+        IrModelFields = self.env['ir.model.fields']
+        if not IrModelFields.search_count([('model', '=', model.model), ('name', '=', 'x_is_deleted')]):
             IrModelFields.create({
                 'name': 'x_is_deleted',
                 'model_id': model.id,
@@ -51,59 +358,302 @@ class SoftDeleteManagerConfig(models.Model):
                 'store': True,
             })
             _logger.info(f"✅ Created x_is_deleted field in {model.model}")
+        self._ensure_deleted_at_field(model)
+        # Apply action domain to ensure soft-deleted records are not shown in tree views
+        self._apply_action_domain(model.ids)
 
-            # Ensure database column exists
-            table_name = model.model.replace('.', '_')
-            self.env.cr.execute("""
-                SELECT column_name FROM information_schema.columns
-                WHERE table_name = %s AND column_name = 'x_is_deleted'
-            """, (table_name,))
-            column_exists = self.env.cr.fetchone()
+    def _ensure_deleted_at_field(self, model):
+        """Add the x_deleted_at field, set by soft delete and used by the retention purge, to the given model."""
+        IrModelFields = self.env['ir.model.fields']
+        if IrModelFields.search_count([('model', '=', model.model), ('name', '=', 'x_deleted_at')]):
+            return
+        # A nullable column without default is added without rewriting the table
+        IrModelFields.create({
+            'name': 'x_deleted_at',
+            'model_id': model.id,
+            'model': model.model,
+            'field_description': 'Deleted On',
+            'ttype': 'datetime',
+            'store': True,
+            'readonly': True,
+        })
+        _logger.info(f"✅ Created x_deleted_at field in {model.model}")
 
-            if not column_exists:
-                self.env.cr.execute(f"""
-                    ALTER TABLE "{table_name}"
-                    ADD COLUMN x_is_deleted BOOLEAN DEFAULT FALSE
-                """)
-                _logger.info(f"🗃️ Added x_is_deleted column to table {table_name}")
-            else:
-                self.env.cr.execute(f"""
-                    ALTER TABLE "{table_name}"
-                    ALTER COLUMN x_is_deleted SET DEFAULT FALSE
-                """)
-                _logger.info(f"🔁 Updated x_is_deleted column to default FALSE in {table_name}")
+    def _backfill_deleted_at(self, model_name):
+        """Start the retention period of records soft-deleted before x_deleted_at existed now."""
+        model = self.env[model_name]
+        if 'x_deleted_at' not in model._fields:
+            return
+        model.flush_model(['x_is_deleted', 'x_deleted_at'])
+        self.env.cr.execute(f"""
+            UPDATE "{model._table}" SET x_deleted_at = (now() at time zone 'UTC')
+            WHERE x_is_deleted AND x_deleted_at IS NULL
+        """)
+        updated_count = self.env.cr.rowcount
+        if updated_count:
+            model.invalidate_model(['x_deleted_at'])
+            _logger.info(f"Initialised x_deleted_at of {updated_count} deleted records in {model_name}")
 
-            self.env.cr.commit()
+    def _get_table_name(self, model_name):
+        """Return the database table of the given model."""
+        if model_name in self.env:
+            return self.env[model_name]._table
+        return model_name.replace('.', '_')
 
-        # Apply action domain to ensure soft-deleted records are not shown in tree views
-        self._apply_action_domain(new_model_ids)
+    def _in_test_transaction(self):
+        """Return whether the current transaction is never committed, so separate cursors cannot see its changes."""
+        return self.pool.in_test_mode() or getattr(threading.current_thread(), 'testing', False)
 
-    def _apply_action_domain(self, model_ids):
-        """Apply domain to actions to exclude soft-deleted records in tree views."""
-        IrModel = self.env['ir.model']
-        IrModelData = self.env['ir.model.data']
-        IrActionsActWindow = self.env['ir.actions.act_window']
-
-        for model in IrModel.browse(model_ids):
-            action = IrActionsActWindow.search([
-                ('res_model', '=', model.model),
-                ('view_mode', 'in', ['tree,form', 'form,tree'])
-            ], limit=1)
-
-            if action:
-                action.write({
-                    'domain': "[('x_is_deleted', '=', False)]"
+    @api.model
+    def _delete_expired_rows(self, table_name, cutoff, chunk_size):
+        """Delete the rows of a table of the module dated before ``cutoff``, in committed chunks.
+
+        Returns the number of deleted rows.
+        """
+        auto_commit = not self._in_test_transaction()
+        deleted_total = 0
+        while True:
+            self.env.cr.execute(f"""
+                DELETE FROM "{table_name}"
+                WHERE id IN (SELECT id FROM "{table_name}" WHERE date < %s LIMIT %s)
+            """, (cutoff, chunk_size))
+            deleted_count = self.env.cr.rowcount
+            deleted_total += deleted_count
+            if deleted_count < chunk_size:
+                return deleted_total
+            if auto_commit:
+                self.env.cr.commit()
+
+    @contextmanager
+    def _autocommit_cursor(self, lock_timeout=None):
+        """Yield a separate cursor in autocommit mode, for DDL that cannot run in a transaction."""
+        with self.pool.cursor() as cr:
+            cr._cnx.autocommit = True
+            try:
+                if lock_timeout:
+                    cr.execute("SET lock_timeout = %s", (lock_timeout,))
+                yield cr
+            finally:
+                if lock_timeout:
+                    cr.execute("RESET lock_timeout")
+                cr._cnx.autocommit = False
+
+    def _create_soft_delete_indexes(self, model_name, allow_blocking=True):
+        """Create the partial indexes on deleted and not deleted records for the given model.
+
+        Indexes are built with CREATE INDEX CONCURRENTLY from an autocommit cursor so
+        writes on the table are not blocked. The build waits for every older transaction,
+        so it has no lock timeout and the caller must not keep a transaction open meanwhile.
+        If the build fails (test mode, other error) the index is built in the current
+        transaction instead, or the error is raised when ``allow_blocking`` is False.
+        """
+        table_name = self._get_table_name(model_name)
+        for suffix, (columns, predicate, _domain) in SOFT_DELETE_INDEXES.items():
+            index_name = _soft_delete_index_name(table_name, suffix)
+            ddl = f'CREATE INDEX {{}} IF NOT EXISTS "{index_name}" ON "{table_name}" ({columns}) WHERE {predicate}'
+            if not self._in_test_transaction():
+                try:
+                    with self._autocommit_cursor() as cr:
+                        if self._is_invalid_index(cr, index_name):
+                            cr.execute(f'DROP INDEX CONCURRENTLY IF EXISTS "{index_name}"')
+                        cr.execute(ddl.format('CONCURRENTLY'))
+                    _logger.info(f"🗂️ Created index {index_name} on {table_name} concurrently")
+                    continue
+                except psycopg2.Error as e:
+                    if not allow_blocking:
+                        raise
+                    _logger.warning(f"Concurrent creation of index {index_name} failed, building it in the current transaction: {str(e)}")
+            # A failed concurrent build leaves an invalid index behind, which IF NOT EXISTS would keep
+            if self._is_invalid_index(self.env.cr, index_name):
+                self.env.cr.execute(f'DROP INDEX IF EXISTS "{index_name}"')
+            self.env.cr.execute(ddl.format(''))
+            _logger.info(f"🗂️ Created index {index_name} on {table_name}")
+
+    @api.model
+    def _has_soft_delete_indexes(self, model_name):
+        """Return whether every soft delete index of the model exists and is valid."""
+        table_name = self._get_table_name(model_name)
+        index_names = [_soft_delete_index_name(table_name, suffix) for suffix in SOFT_DELETE_INDEXES]
+        self.env.cr.execute("""
+            SELECT count(*) FROM pg_index i JOIN pg_class c ON c.oid = i.indexrelid
+            WHERE c.relname = ANY(%s) AND i.indisvalid
+        """, (index_names,))
+        return self.env.cr.fetchone()[0] == len(index_names)
+
+    @api.model
+    def _is_invalid_index(self, cr, index_name):
+        """Return whether ``index_name`` exists but is invalid, as left by an interrupted concurrent build."""
+        cr.execute("""
+            SELECT 1 FROM pg_index i JOIN pg_class c ON c.oid = i.indexrelid
+            WHERE c.relname = %s AND NOT i.indisvalid
+        """, (index_name,))
+        return bool(cr.fetchone())
+
+    def _drop_soft_delete_indexes(self, model_name):
+        """Drop the partial indexes on x_is_deleted of a model removed from the configuration."""
+        table_name = self._get_table_name(model_name)
+        for suffix in SOFT_DELETE_INDEXES:
+            index_name = _soft_delete_index_name(table_name, suffix)
+            if not self._in_test_transaction():
+                try:
+                    with self._autocommit_cursor(lock_timeout=INDEX_LOCK_TIMEOUT) as cr:
+                        cr.execute(f'DROP INDEX CONCURRENTLY IF EXISTS "{index_name}"')
+                    _logger.info(f"Dropped index {index_name} on {table_name} concurrently")
+                    continue
+                except psycopg2.Error as e:
+                    _logger.warning(f"Concurrent drop of index {index_name} failed, dropping it in the current transaction: {str(e)}")
+            self.env.cr.execute(f'DROP INDEX IF EXISTS "{index_name}"')
+            _logger.info(f"Dropped index {index_name} on {table_name}")
+
+    @api.model
+    def get_soft_delete_index_report(self):
+        """Return, for every configured model, the size and planner usage of its soft delete indexes.
+
+        The planner usage is checked on the query the ORM builds for the domain of the
+        index, so that an index the filtered searches cannot match is reported unused.
+        """
+        report = []
+        for model_name in self._get_config_state()['model_names']:
+            if model_name not in self.env:
+                continue
+            model = self.env[model_name]
+            table_name = self._get_table_name(model_name)
+            for suffix, (columns, _predicate, domain) in SOFT_DELETE_INDEXES.items():
+                index_name = _soft_delete_index_name(table_name, suffix)
+                self.env.cr.execute("""
+                    SELECT pg_size_pretty(pg_relation_size(c.oid)), i.indisvalid, COALESCE(s.idx_scan, 0)
+                    FROM pg_class c
+                    JOIN pg_index i ON i.indexrelid = c.oid
+                    LEFT JOIN pg_stat_user_indexes s ON s.indexrelid = c.oid
+                    WHERE c.relname = %s
+                """, (index_name,))
+                row = self.env.cr.fetchone()
+                if not row:
+                    report.append({'model': model_name, 'index': index_name, 'exists': False})
+                    continue
+                size, valid, scans = row
+                query = model._where_calc(domain)
+                query.order = ', '.join(f'"{table_name}".{column.strip()}' for column in columns.split(','))
+                query.limit = 80
+                query_str, params = query.select(f'"{table_name}".id')
+                self.env.cr.execute(f'EXPLAIN (FORMAT JSON) {query_str}', params)
+                plan = str(self.env.cr.fetchone()[0])
+                report.append({
+                    'model': model_name,
+                    'index': index_name,
+                    'exists': True,
+                    'valid': valid,
+                    'size': size,
+                    'scans': scans,
+                    'used_by_planner': index_name in plan,
                 })
-                xml_id_record = IrModelData.search([
-                    ('model', '=', 'ir.actions.act_window'),
-                    ('res_id', '=', action.id)
-                ], limit=1)
-                if xml_id_record:
-                    _logger.info(f"Updated domain for action {xml_id_record.module}.{xml_id_record.name} of model {model.model}")
-                else:
-                    _logger.info(f"Updated domain for action (no XML ID) of model {model.model}")
+        return report
+
+    @api.model
+    def get_table_maintenance_report(self):
+        """Return the dead rows, pending statistics and last maintenance of the configured tables.
+
+        Every entry has a ``needs`` key, ``'vacuum'``, ``'analyze'`` or False, computed from the
+        ``soft_delete_manager.maintenance_*`` thresholds.
+        """
+        get_param = self.env['ir.config_parameter'].sudo().get_param
+        vacuum_ratio = float(get_param('soft_delete_manager.maintenance_vacuum_ratio', MAINTENANCE_VACUUM_RATIO))
+        analyze_ratio = float(get_param('soft_delete_manager.maintenance_analyze_ratio', MAINTENANCE_ANALYZE_RATIO))
+        min_rows = int(get_param('soft_delete_manager.maintenance_min_rows', MAINTENANCE_MIN_ROWS))
+        tables = {
+            self._get_table_name(model_name): model_name
+            for model_name in self._get_config_state()['model_names'] if model_name in self.env
+        }
+        tables.update((table_name, table_name) for table_name in MAINTAINED_MODULE_TABLES)
+        self.env.cr.execute("""
+            SELECT relname, n_live_tup, n_dead_tup, n_mod_since_analyze,
+                   pg_size_pretty(pg_total_relation_size(relid)),
+                   GREATEST(last_vacuum, last_autovacuum), GREATEST(last_analyze, last_autoanalyze)
+            FROM pg_stat_user_tables
+            WHERE schemaname = current_schema() AND relname = ANY(%s)
+            ORDER BY relname
+        """, (list(tables),))
+        report = []
+        for table_name, live, dead, modified, size, last_vacuum, last_analyze in self.env.cr.fetchall():
+            rows = live + dead
+            dead_ratio = dead / rows if rows else 0.0
+            needs = False
+            if dead >= min_rows and dead_ratio >= vacuum_ratio:
+                needs = 'vacuum'
+            elif modified >= min_rows and modified >= analyze_ratio * max(live, 1):
+                needs = 'analyze'
+            report.append({
+                'model': tables[table_name],
+                'table': table_name,
+                'live': live,
+                'dead': dead,
+                'dead_ratio': dead_ratio,
+                'modified': modified,
+                'size': size,
+                'last_vacuum': last_vacuum,
+                'last_analyze': last_analyze,
+                'needs': needs,
+            })
+        return report
+
+    @api.model
+    def _cron_maintain_tables(self):
+        """Run VACUUM or ANALYZE on the configured tables past the maintenance thresholds.
+
+        The commands run from an autocommit cursor with SKIP_LOCKED and a short lock timeout:
+        their lock does not block reads or writes, and a table another session holds a
+        conflicting lock on is skipped until the next run instead of being waited for.
+        """
+        if self._in_test_transaction():
+            return
+        for entry in self.get_table_maintenance_report():
+            if not entry['needs']:
+                continue
+            command = 'VACUUM (ANALYZE, SKIP_LOCKED)' if entry['needs'] == 'vacuum' else 'ANALYZE (SKIP_LOCKED)'
+            try:
+                with self._autocommit_cursor(lock_timeout=MAINTENANCE_LOCK_TIMEOUT) as cr:
+                    cr.execute(f'{command} "{entry["table"]}"')
+                _logger.info(f"🧹 Ran {command} on {entry['table']}: {entry['dead']} dead rows, "
+                             f"{entry['modified']} rows modified since the last analyze")
+            except psycopg2.Error as e:
+                _logger.warning(f"Maintenance of table {entry['table']} failed: {str(e)}")
+
+    @api.model
+    def _schedule_table_maintenance(self, row_count):
+        """Trigger the table maintenance after an operation that updated or deleted many rows."""
+        if row_count < MAINTENANCE_TRIGGER_ROWS:
+            return
+        cron = self.env.ref('soft_delete_manager.ir_cron_soft_delete_maintenance', raise_if_not_found=False)
+        if cron:
+            cron._trigger()
+
+    def _apply_action_domain(self, model_ids):
+        """Hide soft-deleted records from the main window action of the given models, with batched lookups."""
+        model_names = self.env['ir.model'].browse(model_ids).mapped('model')
+        if not model_names:
+            return
+        action_ids = {}
+        for action in self.env['ir.actions.act_window'].search_read([
+            ('res_model', 'in', model_names),
+            ('view_mode', 'in', ['tree,form', 'form,tree']),
+        ], ['res_model']):
+            action_ids.setdefault(action['res_model'], action['id'])
+        self.env['ir.actions.act_window'].browse(list(action_ids.values())).write({
+            'domain': "[('x_is_deleted', '=', False)]"
+        })
+        xml_ids = {
+            data['res_id']: f"{data['module']}.{data['name']}"
+            for data in self.env['ir.model.data'].search_read([
+                ('model', '=', 'ir.actions.act_window'),
+                ('res_id', 'in', list(action_ids.values())),
+            ], ['res_id', 'module', 'name'])
+        }
+        for model_name in model_names:
+            if model_name in action_ids:
+                action_id = action_ids[model_name]
+                _logger.debug(f"Updated domain for action {xml_ids.get(action_id, action_id)} of model {model_name}")
             else:
-                _logger.warning(f"No action found for model {model.model}")
+                _logger.warning(f"No action found for model {model_name}")
 
     def _apply_custom_unlink(self, model_ids):
         """Dynamically patch the unlink method of the given models."""
@@ -118,8 +668,8 @@ class SoftDeleteManagerConfig(models.Model):
             model_cls = self.env[model_name].__class__
 
             # Check if already patched to avoid infinite recursion
-            if hasattr(model_cls, '_soft_delete_patched') and model_cls._soft_delete_patched:
-                _logger.info(f"🔒 unlink already patched for {model_name}, skipping.")
+            if model_cls.__dict__.get('_soft_delete_patched'):
+                _logger.debug(f"🔒 unlink already patched for {model_name}, skipping.")
                 return
 
             original_unlink = getattr(model_cls, 'unlink', None)
@@ -133,109 +683,662 @@ class SoftDeleteManagerConfig(models.Model):
             def patched_unlink(self):
                 """Modified unlink method to perform soft delete."""
                 _logger.debug(f"Executing patched unlink for model {model_name} on records: {self.ids}")
-                for record in self:
-                    if 'x_is_deleted' in record._fields:
-                        if not record.x_is_deleted:  # Only update if not already deleted
-                            record.write({'x_is_deleted': True})
-                            _logger.info(f"Soft-deleted record ID {record.id} in model {model_name}")
-                        else:
-                            _logger.debug(f"Record ID {record.id} in model {model_name} already soft-deleted")
-                    else:
-                        _logger.warning(f"x_is_deleted field not found in {model_name}, falling back to original unlink for record ID {record.id}")
-                        original_unlink(record)
+                if 'x_is_deleted' not in self._fields:
+                    # Soft delete is still being enabled: refuse rather than lose the records
+                    raise UserError(_("Soft delete is being enabled on %s, please try again in a moment.", model_name))
+                self.env['soft.delete.manager.config']._soft_delete_records(self)
                 return True
 
+            original_search = model_cls._search
+            original_read_group_raw = model_cls._read_group_raw
+            setattr(model_cls, '_search_original', original_search)
+            setattr(model_cls, '_read_group_raw_original', original_read_group_raw)
+
+            def patched_search(self, domain, *args, **kwargs):
+                """Exclude soft-deleted records from searches when global filtering is enabled."""
+                if not self.env.context.get('include_deleted') and 'x_is_deleted' in self._fields \
+                        and self.env['soft.delete.manager.config']._is_filter_deleted_enabled():
+                    domain = _exclude_deleted_domain(domain)
+                return original_search(self, domain, *args, **kwargs)
+
+            def patched_read_group_raw(self, domain, *args, **kwargs):
+                """Exclude soft-deleted records from grouped reads when global filtering is enabled."""
+                if not self.env.context.get('include_deleted') and 'x_is_deleted' in self._fields \
+                        and self.env['soft.delete.manager.config']._is_filter_deleted_enabled():
+                    domain = _exclude_deleted_domain(domain)
+                return original_read_group_raw(self, domain, *args, **kwargs)
+
             model_cls.unlink = patched_unlink
+            model_cls._search = patched_search
+            model_cls._read_group_raw = patched_read_group_raw
             model_cls._soft_delete_patched = True
-            _logger.info(f"✅ Patched unlink method for model: {model_name}")
+            _logger.debug(f"✅ Patched unlink method for model: {model_name}")
         except Exception as e:
             _logger.error(f"Failed to patch unlink method for {model_name}: {str(e)}")
             raise
 
+    def _unpatch_unlink_method(self, model_name):
+        """Restore the original unlink, search and grouped read methods of the given model."""
+        if model_name not in self.pool:
+            return
+        model_cls = self.pool[model_name]
+        if not model_cls.__dict__.get('_soft_delete_patched'):
+            return
+        for attribute in PATCHED_ATTRIBUTES:
+            if attribute in model_cls.__dict__:
+                delattr(model_cls, attribute)
+        _logger.debug(f"Restored original unlink method for model: {model_name}")
+
     @api.model
-    def populate_wizard_records(self, model_name, wizard_model_name):
-        """Populate wizard records for soft-deleted records of the given model."""
-        _logger.info(f"Populating wizard records for model: {model_name}, wizard: {wizard_model_name}")
-        try:
-            model = self.env[model_name]
-            deleted_records = model.with_context(active_test=False).search([('x_is_deleted', '=', True)])
-
-            wizard_model = self.env[wizard_model_name]
-            ir_model = self.env['ir.model'].search([('model', '=', model_name)], limit=1)
-
-            if not ir_model:
-                _logger.error(f"No ir.model record found for model: {model_name}")
-                raise ValueError(f"Model {model_name} not found in ir.model")
-
-            # Remove wizard records for non-deleted or non-existent records
-            existing_wizards = wizard_model.search([('x_model_id', '=', ir_model.id)])
-            for wiz in existing_wizards:
-                record = model.browse(wiz.x_record_id)
-                if not record.exists() or not record.x_is_deleted:
-                    wiz.unlink()
-
-            records_to_create = []
-            for record in deleted_records:
-                existing_wizard = wizard_model.search([
-                    ('x_model_id', '=', ir_model.id),
-                    ('x_record_id', '=', record.id),
-                ], limit=1)
-
-                if not existing_wizard:
-                    records_to_create.append({
-                        'x_model_id': ir_model.id,
-                        'x_record_id': record.id,
-                        'x_display_name': record.display_name if hasattr(record, 'display_name') else str(record.id),
-                    })
-                    _logger.debug(f"Prepared wizard record for {model_name} (ID: {record.id})")
-
-            if records_to_create:
-                wizard_model.create(records_to_create)
-                _logger.info(f"Created {len(records_to_create)} wizard records for {wizard_model_name}")
-            else:
-                _logger.info(f"No new wizard records to create for {wizard_model_name}")
+    @ormcache()
+    def _get_config_id(self):
+        """Return the id of the configuration record, or False if it does not exist yet."""
+        return self.sudo().search([], limit=1).id
 
-        except Exception as e:
-            _logger.error(f"Failed to populate wizard records for {model_name}, wizard: {wizard_model_name}: {str(e)}")
-            raise
+    @api.model
+    @ormcache('config_id')
+    def _get_config_values(self, config_id):
+        """Return the configuration state of the given configuration record."""
+        config = self.sudo().browse(config_id)
+        return frozendict({
+            'model_ids': tuple(config.model_ids.ids),
+            'model_names': tuple(config.model_ids.mapped('model')),
+            'filter_deleted_records': config.filter_deleted_records,
+            'cascade_soft_delete': config.cascade_soft_delete,
+            'tombstone_on_purge': config.tombstone_on_purge,
+            'online_enablement': config.online_enablement,
+        })
+
+    @api.model
+    def _get_config_state(self):
+        """Return the cached configuration state, without any query once the cache is warm."""
+        config_id = self._get_config_id()
+        if not config_id:
+            return frozendict({
+                'model_ids': (),
+                'model_names': (),
+                'filter_deleted_records': False,
+                'cascade_soft_delete': False,
+                'tombstone_on_purge': False,
+                'online_enablement': False,
+            })
+        return self._get_config_values(config_id)
+
+    @api.model
+    def _is_filter_deleted_enabled(self):
+        """Return whether soft-deleted records are hidden from every search of the configured models."""
+        return self._get_config_state()['filter_deleted_records']
+
+    @api.model
+    def _benchmark_deleted_filter(self, model_name, iterations=20, limit=80):
+        """Measure the cost of the soft delete filter on common read paths of ``model_name``.
+
+        Each case is run ``iterations`` times with and without ``x_is_deleted = False``
+        and the median timings are returned in milliseconds, e.g. from ``odoo-bin shell``::
+
+            env['soft.delete.manager.config']._benchmark_deleted_filter('sale.order')
+        """
+        model = self.env[model_name].with_context(include_deleted=True)
+        group_field = 'create_uid' if 'create_uid' in model._fields else 'id'
+        cases = {
+            'search': lambda domain: model.search(domain, limit=limit),
+            'search_count': lambda domain: model.search_count(domain),
+            'name_search': lambda domain: model._name_search('', args=domain, limit=limit),
+            'read_group': lambda domain: model.read_group(domain, [group_field], [group_field], lazy=False),
+        }
+        results = {}
+        for case, run in cases.items():
+            timings = {}
+            for variant, domain in (('unfiltered', []), ('filtered', [('x_is_deleted', '=', False)])):
+                samples = []
+                for _iteration in range(iterations):
+                    self.env.invalidate_all()
+                    start = time.perf_counter()
+                    run(domain)
+                    samples.append((time.perf_counter() - start) * 1000)
+                timings[variant] = sorted(samples)[len(samples) // 2]
+            timings['overhead_pct'] = (timings['filtered'] / timings['unfiltered'] - 1) * 100 if timings['unfiltered'] else 0.0
+            results[case] = timings
+            _logger.info(f"Benchmark {model_name}.{case}: unfiltered {timings['unfiltered']:.2f} ms, filtered {timings['filtered']:.2f} ms ({timings['overhead_pct']:+.1f}%)")
+        return results
+
+    @api.model
+    def get_deleted_count(self, model_name):
+        """Return ``{'count': n, 'estimated': bool}``, the number of soft-deleted records of the model.
+
+        The count is read from the ``x_is_deleted`` partial index, or estimated by the planner
+        for tables larger than ``soft_delete_manager.deleted_count_estimate_threshold`` rows, and
+        cached for ``DELETED_COUNT_TTL`` seconds. Record rules are not applied: the count is a hint.
+        Models whose enablement has not added the soft delete fields yet have no deleted records.
+        """
+        if model_name not in self._get_config_state()['model_names'] or model_name not in self.env \
+                or 'x_is_deleted' not in self.env[model_name]._fields:
+            return {'count': 0, 'estimated': False}
+        self.env[model_name].check_access_rights('read')
+        key = (self.env.cr.dbname, model_name)
+        cached = _deleted_count_cache.get(key)
+        if cached and cached[0] > time.monotonic():
+            return {'count': cached[1], 'estimated': cached[2]}
+
+        table_name = self._get_table_name(model_name)
+        threshold = int(self.env['ir.config_parameter'].sudo().get_param(
+            'soft_delete_manager.deleted_count_estimate_threshold', DELETED_COUNT_ESTIMATE_THRESHOLD))
+        self.env.cr.execute("SELECT reltuples FROM pg_class WHERE oid = %s::regclass", (table_name,))
+        estimated = self.env.cr.fetchone()[0] > threshold
+        if estimated:
+            self.env.cr.execute(f'EXPLAIN (FORMAT JSON) SELECT id FROM "{table_name}" WHERE x_is_deleted')
+            count = int(self.env.cr.fetchone()[0][0]['Plan']['Plan Rows'])
+        else:
+            self.env[model_name].flush_model(['x_is_deleted'])
+            self.env.cr.execute(f'SELECT count(*) FROM "{table_name}" WHERE x_is_deleted')
+            count = self.env.cr.fetchone()[0]
+        _deleted_count_cache[key] = (time.monotonic() + DELETED_COUNT_TTL, count, estimated)
+        return {'count': count, 'estimated': estimated}
+
+    @api.model
+    def _invalidate_deleted_count(self, model_name):
+        """Drop the cached deleted records count of the model in this worker."""
+        _deleted_count_cache.pop((self.env.cr.dbname, model_name), None)
+
+    @api.model
+    def _soft_delete_records(self, records):
+        """Soft delete ``records`` as a set: a single query skips the rows that are
+        already flagged and a single recordset write flags the others, so caches,
+        recomputes and write access checks go through the ORM once per call."""
+        if not records:
+            return records
+        with self.env['soft.delete.stats']._measure('soft_delete', records._name) as sample:
+            records.flush_recordset(['x_is_deleted'])
+            self.env.cr.execute(f"""
+                SELECT id FROM "{records._table}"
+                WHERE id = ANY(%s) AND x_is_deleted IS NOT TRUE
+            """, (list(set(records.ids)),))
+            to_delete = records.browse([row[0] for row in self.env.cr.fetchall()])
+            if to_delete:
+                deleted_at = fields.Datetime.now()
+                vals = {'x_is_deleted': True}
+                if 'x_deleted_at' in records._fields:
+                    vals['x_deleted_at'] = deleted_at
+                to_delete.write(vals)
+                self._invalidate_deleted_count(records._name)
+                self.env['soft.delete.journal']._log('soft_delete', records._name, to_delete.ids)
+                if self._get_config_state()['cascade_soft_delete']:
+                    self._cascade_soft_delete(records._name, to_delete.ids, deleted_at)
+            sample['rows'] = len(to_delete)
+        self._schedule_table_maintenance(len(to_delete))
+        _logger.info(f"Soft-deleted {len(to_delete)} records in model {records._name} ({len(records) - len(to_delete)} already deleted)")
+        return to_delete
+
+    @api.model
+    @ormcache()
+    def _get_cascade_graph(self):
+        """Return the one2many dependency graph between the configured models.
+
+        The graph maps a parent model to ``(child model, inverse many2one column)`` pairs. It is
+        built once from ir.model.fields and cached until the configuration changes.
+        """
+        model_names = list(self._get_config_state()['model_names'])
+        graph = {}
+        for field in self.env['ir.model.fields'].sudo().search_read([
+            ('model', 'in', model_names),
+            ('relation', 'in', model_names),
+            ('ttype', '=', 'one2many'),
+        ], ['model', 'relation', 'relation_field']):
+            if field['relation'] not in self.env or field['model'] not in self.env:
+                continue
+            child_model = self.env[field['relation']]
+            inverse = child_model._fields.get(field['relation_field'])
+            if not inverse or inverse.type != 'many2one' or not inverse.store or 'x_is_deleted' not in child_model._fields:
+                continue
+            graph.setdefault(field['model'], set()).add((field['relation'], field['relation_field']))
+        return frozendict({parent: tuple(sorted(children)) for parent, children in graph.items()})
+
+    def _cascade_soft_delete(self, model_name, parent_ids, deleted_at):
+        """Soft delete the children of the given parents, with one UPDATE per child table and level."""
+        for child_model_name, column in self._get_cascade_graph().get(model_name, ()):
+            child_model = self.env[child_model_name]
+            has_deleted_at = 'x_deleted_at' in child_model._fields
+            child_model.flush_model([column, 'x_is_deleted'] + (['x_deleted_at'] if has_deleted_at else []))
+            self.env.cr.execute(f"""
+                UPDATE "{child_model._table}"
+                SET x_is_deleted = TRUE{", x_deleted_at = %(deleted_at)s" if has_deleted_at else ""}
+                WHERE "{column}" = ANY(%(parent_ids)s) AND x_is_deleted IS NOT TRUE
+                RETURNING id
+            """, {'deleted_at': deleted_at, 'parent_ids': list(parent_ids)})
+            child_ids = [row[0] for row in self.env.cr.fetchall()]
+            if not child_ids:
+                continue
+            children = child_model.browse(child_ids)
+            children.invalidate_recordset(['x_is_deleted', 'x_deleted_at'] if has_deleted_at else ['x_is_deleted'])
+            children.modified(['x_is_deleted', 'x_deleted_at'] if has_deleted_at else ['x_is_deleted'])
+            self._invalidate_deleted_count(child_model_name)
+            self.env['soft.delete.journal']._log('soft_delete', child_model_name, child_ids)
+            _logger.debug(f"Cascaded soft delete to {len(child_ids)} records in model {child_model_name}")
+            # Rows that were already deleted are not returned, so cycles stop by themselves
+            self._cascade_soft_delete(child_model_name, child_ids, deleted_at)
+
+    def _cascade_restore(self, model_name, parent_ids):
+        """Restore the children that were soft-deleted together with the given parents.
+
+        A child is restored only if it was deleted at the same time as its parent, so children
+        deleted on their own beforehand stay in the recycle bin.
+        """
+        parent_model = self.env[model_name]
+        parent_has_deleted_at = 'x_deleted_at' in parent_model._fields
+        parent_model.flush_model(['x_is_deleted'] + (['x_deleted_at'] if parent_has_deleted_at else []))
+        for child_model_name, column in self._get_cascade_graph().get(model_name, ()):
+            child_model = self.env[child_model_name]
+            has_deleted_at = parent_has_deleted_at and 'x_deleted_at' in child_model._fields
+            child_model.flush_model([column, 'x_is_deleted'] + (['x_deleted_at'] if has_deleted_at else []))
+            self.env.cr.execute(f"""
+                SELECT c.id FROM "{child_model._table}" c
+                JOIN "{parent_model._table}" p ON p.id = c."{column}"
+                WHERE p.id = ANY(%s) AND c.x_is_deleted
+                {"AND c.x_deleted_at = p.x_deleted_at" if has_deleted_at else ""}
+            """, (list(parent_ids),))
+            child_ids = [row[0] for row in self.env.cr.fetchall()]
+            if not child_ids:
+                continue
+            # Grandchildren are matched on the deletion date of the children, restore them first
+            self._cascade_restore(child_model_name, child_ids)
+            child_has_deleted_at = 'x_deleted_at' in child_model._fields
+            self.env.cr.execute(f"""
+                UPDATE "{child_model._table}"
+                SET x_is_deleted = FALSE{", x_deleted_at = NULL" if child_has_deleted_at else ""}
+                WHERE id = ANY(%s)
+            """, (child_ids,))
+            children = child_model.browse(child_ids)
+            children.invalidate_recordset(['x_is_deleted', 'x_deleted_at'] if child_has_deleted_at else ['x_is_deleted'])
+            children.modified(['x_is_deleted', 'x_deleted_at'] if child_has_deleted_at else ['x_is_deleted'])
+            self._invalidate_deleted_count(child_model_name)
+            self.env['soft.delete.journal']._log('restore', child_model_name, child_ids)
+            _logger.debug(f"Cascaded restore to {len(child_ids)} records in model {child_model_name}")
+
+    @api.model
+    def open_recycle_bin(self, model_name):
+        """Return the window action listing the soft-deleted records of the given model.
+
+        Called directly by the Recover Deleted button, so the bin opens in a single round trip.
+        """
+        self._check_configured_model(model_name)
+        action = self.env['ir.actions.act_window']._for_xml_id('soft_delete_manager.action_soft_delete_recycle_bin')
+        action.update({
+            'name': _("%s Recover Deleted Records", self.env['ir.model']._get(model_name).name),
+            'domain': [('res_model', '=', model_name)],
+            'context': {},
+        })
+        return action
+
+    @api.model
+    def _check_configured_model(self, model_name):
+        """Raise unless the model is configured for soft delete and readable by the current user."""
+        if model_name not in self._get_config_state()['model_names']:
+            raise UserError(_("Model %s is not configured in the Soft Delete Manager settings.", model_name))
+        self.env[model_name].check_access_rights('read')
+
+    @api.model
+    def _prepare_export_query(self, model_name):
+        """Return the exported column names and the SQL selecting the soft-deleted records of the model.
+
+        The query goes through the record rules of the current user, like a search would, and
+        only selects the fields the user may read, like ``read`` and ``export_data`` do.
+        """
+        self._check_configured_model(model_name)
+        model = self.env[model_name].with_context(active_test=False)
+        model.flush_model()
+        readable = set(model.check_field_access_rights('read', None))
+        columns = ['id'] + sorted(
+            name for name, field in model._fields.items()
+            if field.store and field.column_type and name != 'id' and name in readable
+        )
+        query = model._where_calc([('x_is_deleted', '=', True)])
+        model._apply_ir_rules(query, 'read')
+        query.order = f'"{model._table}".id'
+        sql, params = query.select(*(f'"{model._table}"."{column}"' for column in columns))
+        return columns, sql, params
+
+    @api.model
+    def _stream_deleted_records(self, model_name, export_format='csv', batch_size=EXPORT_BATCH_SIZE):
+        """Return a generator of the soft-deleted records of the model, encoded as CSV or JSON lines.
+
+        Rows are read from a named PostgreSQL cursor ``batch_size`` at a time, on a cursor of its
+        own so that the generator can outlive the request, and memory use stays flat.
+        """
+        if export_format not in ('csv', 'jsonl'):
+            raise UserError(_("Unsupported export format: %s", export_format))
+        columns, sql, params = self._prepare_export_query(model_name)
+        registry = self.pool
+
+        def generate():
+            start = time.perf_counter()
+            row_count = 0
+            with registry.cursor() as cr, cr._cnx.cursor(name='soft_delete_export') as named_cr:
+                named_cr.itersize = batch_size
+                named_cr.execute(sql, params)
+                buffer = io.StringIO()
+                writer = csv.writer(buffer)
+                if export_format == 'csv':
+                    writer.writerow(columns)
+                while True:
+                    rows = named_cr.fetchmany(batch_size)
+                    if not rows:
+                        break
+                    row_count += len(rows)
+                    if export_format == 'csv':
+                        writer.writerows(rows)
+                    else:
+                        buffer.writelines(json.dumps(dict(zip(columns, row)), default=str) + "\n" for row in rows)
+                    yield buffer.getvalue().encode()
+                    buffer.seek(0)
+                    buffer.truncate()
+                if export_format == 'csv' and not row_count:
+                    yield buffer.getvalue().encode()
+            _logger.info(f"Exported {row_count} deleted records of {model_name} as {export_format} in {time.perf_counter() - start:.1f} s")
+
+        return generate()
+
+    @api.model
+    def _export_deleted_records(self, model_name, path, export_format='csv'):
+        """Write the soft-deleted records of the model to ``path``, e.g. from ``odoo-bin shell``::
+
+            env['soft.delete.manager.config']._export_deleted_records('sale.order', '/tmp/orders.csv')
+        """
+        with open(path, 'wb') as export_file:
+            for chunk in self._stream_deleted_records(model_name, export_format):
+                export_file.write(chunk)
+        return path
+
+    @api.model
+    def _get_unique_constraints(self, model_name):
+        """Return ``(name, columns, predicate, message)`` for every partial unique index of the model's table.
+
+        Soft-deleted rows stay in the table, so a full unique index already keeps them distinct
+        from the live rows and a restore can only violate a partial one. Expression indexes are
+        left to the bulk restore, which isolates their violations.
+        """
+        model = self.env[model_name]
+        messages = {f"{model._table}_{key}": message for key, _definition, message in model._sql_constraints}
+        self.env.cr.execute("""
+            SELECT c.relname, array_agg(a.attname ORDER BY k.ord), pg_get_expr(i.indpred, i.indrelid)
+            FROM pg_index i
+            JOIN pg_class c ON c.oid = i.indexrelid
+            JOIN pg_class t ON t.oid = i.indrelid
+            CROSS JOIN LATERAL unnest(i.indkey::int2[]) WITH ORDINALITY AS k(attnum, ord)
+            JOIN pg_attribute a ON a.attrelid = t.oid AND a.attnum = k.attnum
+            WHERE t.relname = %s
+            AND i.indisunique AND NOT i.indisprimary
+            AND i.indpred IS NOT NULL AND i.indexprs IS NULL
+            GROUP BY c.relname, i.indpred, i.indrelid
+        """, (model._table,))
+        return [
+            (name, columns, predicate, messages.get(name, name))
+            for name, columns, predicate in self.env.cr.fetchall()
+        ]
+
+    @api.model
+    def _find_restore_conflicts(self, model_name, record_ids):
+        """Check a whole restore batch against the partial unique indexes, with one query per index.
+
+        The predicate of the index is evaluated on the rows as they would be after the restore.
+        A record conflicts when another row, live or of the batch with a smaller id, then holds
+        the same values for the indexed columns.
+        """
+        model = self.env[model_name]
+        model.flush_model()
+        constraints = self._get_unique_constraints(model_name)
+        if not constraints:
+            return []
+        self.env.cr.execute("""
+            SELECT attname FROM pg_attribute
+            WHERE attrelid = %s::regclass AND attnum > 0 AND NOT attisdropped
+            ORDER BY attnum
+        """, (model._table,))
+        table_columns = [row[0] for row in self.env.cr.fetchall()]
+        restored_values = {'x_is_deleted': 'FALSE', 'x_deleted_at': 'NULL::timestamp'}
+        current_columns = ", ".join(f'"{column}"' for column in table_columns)
+        restored_columns = ", ".join(
+            f'{restored_values[column]} AS "{column}"' if column in restored_values else f'"{column}"'
+            for column in table_columns
+        )
+        conflicts = {}
+        for name, columns, predicate, message in constraints:
+            key = ", ".join(f'"{column}"' for column in columns)
+            join_condition = " AND ".join(f'l."{column}" = r."{column}"' for column in columns)
+            self.env.cr.execute(f"""
+                WITH restored AS (
+                    SELECT {restored_columns}, TRUE AS soft_delete_restored
+                    FROM "{model._table}"
+                    WHERE id = ANY(%(ids)s) AND x_is_deleted
+                ), after_restore AS (
+                    SELECT * FROM (
+                        SELECT {current_columns}, FALSE AS soft_delete_restored
+                        FROM "{model._table}"
+                        WHERE NOT (id = ANY(%(ids)s) AND x_is_deleted IS TRUE)
+                        AND ({key}) IN (SELECT {key} FROM restored)
+                        UNION ALL
+                        SELECT * FROM restored
+                    ) AS rows
+                    WHERE {predicate}
+                )
+                SELECT DISTINCT ON (r.id) r.id, l.id
+                FROM after_restore r
+                JOIN after_restore l ON {join_condition} AND l.id <> r.id
+                WHERE r.soft_delete_restored AND (NOT l.soft_delete_restored OR l.id < r.id)
+                ORDER BY r.id, l.id
+            """, {'ids': list(record_ids)})
+            for record_id, conflicting_id in self.env.cr.fetchall():
+                conflicts.setdefault(record_id, {
+                    'id': record_id,
+                    'constraint': name,
+                    'conflicting_id': conflicting_id,
+                    'message': message,
+                })
+        return list(conflicts.values())
+
+    def _restore_in_bulk(self, records):
+        """Restore ``records`` in one write, splitting the batch to isolate the records rejected by a constraint.
+
+        The write only triggers the ``@api.constrains`` methods listing ``x_is_deleted``, so every
+        Python constraint of the model is validated explicitly on the restored records, which
+        catches uniqueness checks done in Python. Returns the restored records and the conflicts
+        of the rejected ones.
+        """
+        vals = {'x_is_deleted': False}
+        if 'x_deleted_at' in records._fields:
+            vals['x_deleted_at'] = False
+        constrained_names = {name for method in records._constraint_methods for name in method._constrains}
+        try:
+            with self.env.cr.savepoint():
+                if self._get_config_state()['cascade_soft_delete']:
+                    self._cascade_restore(records._name, records.ids)
+                records.write(vals)
+                records.flush_recordset()
+                if constrained_names:
+                    records._validate_fields(constrained_names)
+            return records, []
+        except (ValidationError, psycopg2.IntegrityError) as e:
+            records.invalidate_recordset()
+            if len(records) == 1:
+                return records.browse(), [{
+                    'id': records.id,
+                    'constraint': False,
+                    'conflicting_id': False,
+                    'message': str(e),
+                }]
+            half = len(records) // 2
+            restored_first, conflicts_first = self._restore_in_bulk(records[:half])
+            restored_last, conflicts_last = self._restore_in_bulk(records[half:])
+            return restored_first | restored_last, conflicts_first + conflicts_last
 
     @api.model
     def restore_records(self, model_name, record_ids):
+        """Restore soft-deleted records, skipping the ones that would violate a unique constraint.
+
+        Returns a dict with the ``restored`` ids and the ``conflicts`` report, one entry per
+        record that was not restored.
+        """
         try:
-            records = self.env[model_name].browse(record_ids)
-            recovered_count = len(records)
-            records.write({'x_is_deleted': False})
-            _logger.info(f"Restored {recovered_count} records in model {model_name}")
-
-            # Remove corresponding wizard records
-            wizard_model_name = f"x_{model_name.replace('.', '_')}_wizard"
-            self.env[wizard_model_name].search([
-                ('x_model_id.model', '=', model_name),
-                ('x_record_id', 'in', record_ids)
-            ]).unlink()
-
-            return True
+            with self.env['soft.delete.stats']._measure('restore', model_name) as sample:
+                records = self.env[model_name].browse(record_ids)
+                conflicts = self._find_restore_conflicts(model_name, records.ids)
+                conflicting_ids = {conflict['id'] for conflict in conflicts}
+                restored, rejected = self._restore_in_bulk(records.browse([
+                    record_id for record_id in records.ids if record_id not in conflicting_ids
+                ]))
+                conflicts += rejected
+                self._invalidate_deleted_count(model_name)
+                self.env['soft.delete.journal']._log('restore', model_name, restored.ids)
+                sample['rows'] = len(restored)
+            self._schedule_table_maintenance(len(restored))
+            _logger.info(f"Restored {len(restored)} records in model {model_name}, {len(conflicts)} conflicts")
+
+            return {'restored': restored.ids, 'conflicts': conflicts}
         except Exception as e:
             _logger.error(f"Failed to restore records for {model_name}: {str(e)}")
             raise
 
+    @api.model
+    @ormcache('model_name')
+    def _get_foreign_key_graph(self, model_name):
+        """Return ``(table, column, action)`` for every single-column foreign key referencing the model's table."""
+        self.env.cr.execute("""
+            SELECT c.conrelid::regclass::text, a.attname, c.confdeltype
+            FROM pg_constraint c
+            JOIN pg_attribute a ON a.attrelid = c.conrelid AND a.attnum = c.conkey[1]
+            WHERE c.contype = 'f' AND c.confrelid = %s::regclass AND array_length(c.conkey, 1) = 1
+            ORDER BY 1, 2
+        """, (self._get_table_name(model_name),))
+        return tuple(
+            (table.strip('"'), column, FOREIGN_KEY_ACTIONS.get(action, action))
+            for table, column, action in self.env.cr.fetchall()
+        )
+
+    @api.model
+    def analyze_purge_impact(self, model_name, record_ids):
+        """Dry run of a permanent delete: count the rows referencing ``record_ids``, per foreign key.
+
+        Returns one entry per referencing table and column with its ``action`` and ``count``.
+        Rows of the selection referencing each other are not counted. Cascaded rows are counted
+        on the first level only.
+        """
+        self._check_configured_model(model_name)
+        table_name = self._get_table_name(model_name)
+        self.env.flush_all()
+        report = []
+        for table, column, action in self._get_foreign_key_graph(model_name):
+            self.env.cr.execute(f"""
+                SELECT count(*) FROM "{table}"
+                WHERE "{column}" = ANY(%(ids)s)
+                {"AND NOT id = ANY(%(ids)s)" if table == table_name else ""}
+            """, {'ids': list(record_ids)})
+            count = self.env.cr.fetchone()[0]
+            if count:
+                report.append({'table': table, 'column': column, 'action': action, 'count': count})
+        return report
+
+    @api.model
+    def _split_purgeable_ids(self, model_name, record_ids):
+        """Split ``record_ids`` into the ids a delete can remove and the ids a foreign key blocks.
+
+        Runs one query per restricting foreign key of the cached graph, again while a blocked
+        record of the selection blocks the records it references in turn.
+        """
+        table_name = self._get_table_name(model_name)
+        self.env.flush_all()
+        purgeable_ids = list(record_ids)
+        blocked_ids = set()
+        while purgeable_ids:
+            newly_blocked = set()
+            for table, column, action in self._get_foreign_key_graph(model_name):
+                if action not in BLOCKING_FOREIGN_KEY_ACTIONS:
+                    continue
+                self.env.cr.execute(f"""
+                    SELECT DISTINCT "{column}" FROM "{table}"
+                    WHERE "{column}" = ANY(%(ids)s)
+                    {"AND NOT id = ANY(%(ids)s)" if table == table_name else ""}
+                """, {'ids': purgeable_ids})
+                newly_blocked.update(row[0] for row in self.env.cr.fetchall())
+            if not newly_blocked:
+                break
+            blocked_ids |= newly_blocked
+            purgeable_ids = [record_id for record_id in purgeable_ids if record_id not in newly_blocked]
+        return purgeable_ids, sorted(blocked_ids)
+
     @api.model
     def permanent_delete_records(self, model_name, record_ids):
-        """Permanently delete records and remove corresponding wizard records."""
+        """Permanently delete records.
+
+        Records still referenced through a restricting foreign key are skipped, so the delete
+        of the others succeeds. Returns a dict with the ``deleted`` and ``blocked`` ids.
+        """
         try:
-            records = self.env[model_name].browse(record_ids)
-            deleted_count = len(records)
-            records.unlink_original()  # Call original unlink to perform hard delete
+            with self.env['soft.delete.stats']._measure('purge', model_name) as sample:
+                purgeable_ids, blocked_ids = self._split_purgeable_ids(model_name, record_ids)
+                if blocked_ids:
+                    _logger.warning(f"Skipped {len(blocked_ids)} records of {model_name} still referenced by other records")
+                records = self.env[model_name].browse(purgeable_ids)
+                deleted_count = len(records)
+                if self._get_config_state()['tombstone_on_purge']:
+                    self.env['soft.delete.tombstone']._snapshot(model_name, records.ids)
+                records.unlink_original()  # Call original unlink to perform hard delete
+                self._invalidate_deleted_count(model_name)
+                self.env['soft.delete.journal']._log('purge', model_name, records.ids)
+                sample['rows'] = deleted_count
+            self._schedule_table_maintenance(deleted_count)
             _logger.info(f"Permanently deleted {deleted_count} records in model {model_name}")
 
-            # Remove corresponding wizard records
-            wizard_model_name = f"x_{model_name.replace('.', '_')}_wizard"
-            self.env[wizard_model_name].search([
-                ('x_model_id.model', '=', model_name),
-                ('x_record_id', 'in', record_ids)
-            ]).unlink()
-
-            return True
+            return {'deleted': records.ids, 'blocked': blocked_ids}
         except Exception as e:
             _logger.error(f"Failed to permanently delete records for {model_name}: {str(e)}")
-            raise
\ No newline at end of file
+            raise
+
+    @api.model
+    def _cron_purge_expired_records(self):
+        """Hard-delete the soft-deleted records whose retention period has expired.
+
+        Records are purged oldest id first in chunks of ``soft_delete_manager.purge_chunk_size``
+        with a commit per chunk, so an interrupted run loses at most one chunk and the next run
+        resumes where it stopped. Once ``soft_delete_manager.purge_time_budget`` seconds are
+        spent, the cron is triggered again instead of holding the worker. Records still referenced
+        through a restricting foreign key are skipped and retried on the next run.
+        """
+        ICP = self.env['ir.config_parameter'].sudo()
+        chunk_size = int(ICP.get_param('soft_delete_manager.purge_chunk_size', PURGE_CHUNK_SIZE))
+        deadline = time.monotonic() + float(ICP.get_param('soft_delete_manager.purge_time_budget', PURGE_TIME_BUDGET))
+        auto_commit = not self._in_test_transaction()
+
+        for setting in self.env['soft.delete.manager.model'].search([('retention_days', '>', 0)]):
+            model_name = setting.model
+            if model_name not in self.env or 'x_deleted_at' not in self.env[model_name]._fields:
+                continue
+            table_name = self._get_table_name(model_name)
+            cutoff = fields.Datetime.now() - timedelta(days=setting.retention_days)
+            purged_count = 0
+            last_id = 0
+            while True:
+                if time.monotonic() >= deadline:
+                    _logger.info(f"Purge time budget exhausted after {purged_count} records of {model_name}, rescheduling")
+                    self.env.ref('soft_delete_manager.ir_cron_soft_delete_purge')._trigger()
+                    return
+                self.env.cr.execute(f"""
+                    SELECT id FROM "{table_name}"
+                    WHERE x_is_deleted AND x_deleted_at < %s AND id > %s
+                    ORDER BY id
+                    LIMIT %s
+                """, (cutoff, last_id, chunk_size))
+                record_ids = [row[0] for row in self.env.cr.fetchall()]
+                if not record_ids:
+                    break
+                try:
+                    with self.env.cr.savepoint():
+                        result = self.permanent_delete_records(model_name, record_ids)
+                except Exception as e:
+                    _logger.error(f"Failed to purge expired records of {model_name}, skipping it until the next run: {str(e)}")
+                    break
+                purged_count += len(result['deleted'])
+                last_id = record_ids[-1]
+                setting.last_purge_date = fields.Datetime.now()
+                if auto_commit:
+                    self.env.cr.commit()
+            if purged_count:
+                _logger.info(f"Purged {purged_count} expired records of {model_name} (retention: {setting.retention_days} days)")
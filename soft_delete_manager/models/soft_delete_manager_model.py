@@ -0,0 +1,36 @@
+from odoo import models, fields
+
+
+class SoftDeleteManagerModel(models.Model):
+    _name = 'soft.delete.manager.model'
+    _description = 'Soft Delete Managed Model'
+    _rec_name = 'model_id'
+    _order = 'model'
+
+    config_id = fields.Many2one('soft.delete.manager.config', string="Configuration", required=True, ondelete='cascade')
+    model_id = fields.Many2one('ir.model', string="Model", required=True, readonly=True, ondelete='cascade')
+    model = fields.Char(related='model_id.model', string="Technical Name", store=True)
+    retention_days = fields.Integer(
+        string="Purge After (Days)",
+        help="Soft-deleted records older than this number of days are permanently deleted by the "
+             "retention purge. Leave 0 to keep deleted records forever.")
+    last_purge_date = fields.Datetime(string="Last Purge", readonly=True)
+    enable_state = fields.Selection([
+        ('pending', 'Waiting'),
+        ('columns', 'Columns Added'),
+        ('indexing', 'Building Indexes'),
+        ('ready', 'Ready'),
+    ], string="Status", default='pending', required=True, readonly=True,
+        help="Progress of the enablement of soft delete on the model, resumed by a cron if interrupted.")
+    enable_error = fields.Text(string="Last Error", readonly=True)
+    enable_attempts = fields.Integer(string="Failed Attempts", readonly=True)
+
+    _sql_constraints = [
+        ('model_uniq', 'unique(config_id, model_id)', 'A model can only be configured once.'),
+        ('retention_days_positive', 'CHECK(retention_days >= 0)', 'The retention period cannot be negative.'),
+    ]
+
+    def action_retry_enable(self):
+        """Resume the enablement of the selected models, even after too many failed attempts."""
+        self.filtered(lambda setting: setting.enable_state != 'ready').write({'enable_attempts': 0, 'enable_error': False})
+        self.env.ref('soft_delete_manager.ir_cron_soft_delete_enable')._trigger()
@@ -5,11 +5,8 @@ class SoftDeleteMixin(models.AbstractModel):
     _description = 'Soft Delete Mixin'
 
     x_is_deleted = fields.Boolean(default=False)
+    x_deleted_at = fields.Datetime(readonly=True)
 
     def unlink(self):
-        for record in self:
-            if hasattr(record, 'x_is_deleted'):
-                record.x_is_deleted = True
-            else:
-                super(SoftDeleteMixin, self).unlink()
+        self.env['soft.delete.manager.config']._soft_delete_records(self)
         return True
@@ -0,0 +1,341 @@
+from odoo import models, fields, api, _
+from odoo.exceptions import UserError
+from odoo.osv import expression
+import logging
+
+_logger = logging.getLogger(__name__)
+
+# Recycle bin ids encode the ir.model id and the source record id: model_id * factor + res_id
+RECYCLE_BIN_ID_FACTOR = 1 << 32
+
+# Fields of the recycle bin computed from the source records
+BIN_VALUE_FIELDS = ('res_model', 'res_id', 'name', 'deleted_at')
+
+# Default number of records of a recycle bin page read with search_page
+BIN_PAGE_SIZE = 80
+
+# Number of skipped records listed in the notification shown after a restore or permanent delete
+MAX_REPORTED_CONFLICTS = 20
+
+
+class SoftDeleteRecycleBin(models.Model):
+    """Virtual recycle bin reading soft-deleted records directly from their source table.
+
+    The model has no table of its own: a page of the bin is read by a single ``UNION ALL``
+    query over the deleted rows of every configured table, newest deletion first. Every
+    branch reads the first rows of the partial ``(x_deleted_at, id)`` index of its table,
+    so opening the bin costs one page of rows however many records are deleted.
+    """
+    _name = 'soft.delete.recycle.bin'
+    _description = 'Soft Delete Recycle Bin'
+    _auto = False
+    _rec_name = 'name'
+    _order = 'deleted_at desc, id desc'
+
+    res_model = fields.Char(string="Model", readonly=True)
+    res_id = fields.Integer(string="Original Record ID", readonly=True)
+    name = fields.Char(string="Name", readonly=True)
+    deleted_at = fields.Datetime(string="Deleted On", readonly=True)
+
+    @api.model
+    def _encode_id(self, model_name, res_id):
+        return self.env['ir.model']._get_id(model_name) * RECYCLE_BIN_ID_FACTOR + res_id
+
+    def _get_source_ids(self):
+        """Return the source record ids of the recycle bin records, grouped by model name."""
+        model_ids = {}
+        for bin_id in self._ids:
+            model_id, res_id = divmod(bin_id, RECYCLE_BIN_ID_FACTOR)
+            model_ids.setdefault(model_id, []).append(res_id)
+        return {
+            ir_model.model: model_ids[ir_model.id]
+            for ir_model in self.env['ir.model'].browse(list(model_ids)).exists()
+        }
+
+    @api.model
+    def _get_source_model(self, model_name):
+        if model_name not in self.env or 'x_is_deleted' not in self.env[model_name]._fields:
+            raise UserError(_("Model %s is not configured for soft delete.", model_name))
+        return self.env[model_name].with_context(active_test=False, include_deleted=True)
+
+    @api.model
+    def _parse_bin_domain(self, domain):
+        """Split a recycle bin domain into the selected model names, a source model domain and name filters.
+
+        Only conjunctions of leaves on ``res_model``, ``res_id``, ``name``, ``deleted_at`` and ``id``
+        are supported. Without a filter on the model, every configured model is selected. The
+        ``(operator, value)`` filters on the name are resolved per model by its name search.
+        """
+        model_names = None
+        source_domain = []
+        name_filters = []
+        for leaf in expression.normalize_domain(domain or []):
+            if leaf == expression.AND_OPERATOR:
+                continue
+            if not expression.is_leaf(leaf):
+                raise UserError(_("Only conjunctions of conditions are supported in the recycle bin."))
+            fname, operator, value = leaf
+            if tuple(leaf) == expression.TRUE_LEAF:
+                continue
+            if fname == 'res_model':
+                if operator == '=':
+                    selected = {value}
+                elif operator == 'in':
+                    selected = set(value)
+                else:
+                    raise UserError(_("Unsupported recycle bin filter on model: %s", operator))
+                model_names = selected if model_names is None else model_names & selected
+            elif fname == 'res_id':
+                source_domain.append(('id', operator, value))
+            elif fname == 'name':
+                name_filters.append((operator, value))
+            elif fname == 'deleted_at':
+                source_domain.append(('x_deleted_at', operator, value))
+            elif fname == 'id' and operator == 'in':
+                ids_by_model = self.browse(value)._get_source_ids()
+                model_names = set(ids_by_model) if model_names is None else model_names & set(ids_by_model)
+                source_domain.append(('id', 'in', [res_id for res_ids in ids_by_model.values() for res_id in res_ids]))
+            else:
+                raise UserError(_("Unsupported recycle bin filter: %s", fname))
+        if model_names is None:
+            model_names = {
+                model_name for model_name in self.env['soft.delete.manager.config']._get_config_state()['model_names']
+                if model_name in self.env and 'x_deleted_at' in self.env[model_name]._fields
+            }
+        return sorted(model_names), [('x_is_deleted', '=', True)] + source_domain, name_filters
+
+    @api.model
+    def _get_source_queries(self, domain):
+        """Return ``(model_name, table, query)`` selecting the matching deleted rows of every readable model.
+
+        The queries include the record rules of the source models.
+        """
+        model_names, source_domain, name_filters = self._parse_bin_domain(domain)
+        queries = []
+        for model_name in model_names:
+            source_model = self._get_source_model(model_name)
+            if not source_model.check_access_rights('read', raise_exception=False):
+                continue
+            model_domain = list(source_domain)
+            for operator, value in name_filters:
+                # display_name is neither stored nor searchable, so resolve the names with the name search
+                name_query = source_model._name_search(value, [('x_is_deleted', '=', True)], operator=operator, limit=None)
+                model_domain.append(('id', 'in', name_query))
+            query = source_model._where_calc(model_domain)
+            source_model._apply_ir_rules(query, 'read')
+            queries.append((model_name, source_model._table, query))
+        return queries
+
+    @api.model
+    def _is_descending(self, order):
+        """Return whether a recycle bin order sorts on deletion time descending, the only supported sort."""
+        terms = (order or self._order).split(',')[0].split()
+        return len(terms) < 2 or terms[1].lower() != 'asc' or terms[0] not in ('deleted_at', 'id', 'res_id')
+
+    @api.model
+    def _search_page(self, domain, offset=0, limit=None, order=None, after=None):
+        """Return the ``(id, deleted_at)`` rows of one page of the bin, read by a single UNION ALL query.
+
+        Every branch is ordered and limited on its own, so that it stops after ``offset + limit``
+        entries of the deletion time index of its table. ``after`` is the ``(deleted_at, id)`` key
+        of the last record of the previous page: the page then starts right after that key in the
+        index, instead of reading and skipping the rows of the previous pages.
+        """
+        direction, comparator = ('DESC', '<') if self._is_descending(order) else ('ASC', '>')
+        branch_limit = limit and offset + limit
+        branches, params = [], []
+        for model_name, table, query in self._get_source_queries(domain):
+            id_offset = self.env['ir.model']._get_id(model_name) * RECYCLE_BIN_ID_FACTOR
+            if after:
+                # Within a table, the bin id order is the record id order
+                query.add_where(f'("{table}".x_deleted_at, "{table}".id) {comparator} (%s, %s)',
+                                [after[0], after[1] - id_offset])
+            query.order = f'"{table}".x_deleted_at {direction}, "{table}".id {direction}'
+            query.limit = branch_limit
+            branch, branch_params = query.select(
+                f'{id_offset} + "{table}".id AS id', f'"{table}".x_deleted_at AS deleted_at')
+            branches.append(f"({branch})")
+            params += branch_params
+        if not branches:
+            return []
+        self.env.cr.execute(f"""
+            SELECT id, deleted_at FROM ({" UNION ALL ".join(branches)}) AS bin
+            ORDER BY deleted_at {direction}, id {direction}
+            LIMIT %s OFFSET %s
+        """, params + [limit, offset or 0])
+        return self.env.cr.fetchall()
+
+    @api.model
+    def _count_by_model(self, domain):
+        """Return the number of matching deleted records by model name, with a single UNION ALL query."""
+        branches, params = [], []
+        for model_name, table, query in self._get_source_queries(domain):
+            branch, branch_params = query.select('%s', 'count(1)')
+            branches.append(f"({branch})")
+            params += [model_name] + branch_params
+        if not branches:
+            return {}
+        self.env.cr.execute(" UNION ALL ".join(branches), params)
+        return dict(self.env.cr.fetchall())
+
+    @api.model
+    def _search(self, domain, offset=0, limit=None, order=None, count=False, access_rights_uid=None):
+        if count:
+            return sum(self._count_by_model(domain).values())
+        with self.env['soft.delete.stats']._measure('bin_page', self._name) as sample:
+            rows = self._search_page(domain, offset=offset, limit=limit, order=order)
+            sample['rows'] = len(rows)
+        return [row[0] for row in rows]
+
+    @api.model
+    def search_page(self, domain=None, after=None, limit=BIN_PAGE_SIZE):
+        """Return one page of deleted records of all configured models, newest deletion first.
+
+        Pass the returned ``next`` key as ``after`` to read the following page; it is False
+        after the last page.
+        """
+        if after:
+            after = (fields.Datetime.to_datetime(after[0]), after[1])
+        with self.env['soft.delete.stats']._measure('bin_page', self._name) as sample:
+            rows = self._search_page(domain, limit=limit, after=after)
+            sample['rows'] = len(rows)
+        return {
+            'records': self.browse([row[0] for row in rows]).read(list(BIN_VALUE_FIELDS)),
+            'next': [fields.Datetime.to_string(rows[-1][1]), rows[-1][0]] if limit and len(rows) == limit else False,
+        }
+
+    @api.model
+    def read_group(self, domain, fields, groupby, offset=0, limit=None, orderby=False, lazy=True):
+        """Group the recycle bin by model, the only supported grouping, counted with a single query."""
+        groupby = [groupby] if isinstance(groupby, str) else list(groupby or [])
+        if groupby[:1] != ['res_model']:
+            raise UserError(_("The recycle bin can only be grouped by model."))
+        groups = []
+        for model_name, count in sorted(self._count_by_model(domain).items()):
+            if not count:
+                continue
+            group = {
+                'res_model': model_name,
+                '__domain': expression.AND([domain or [], [('res_model', '=', model_name)]]),
+            }
+            if lazy:
+                group['res_model_count'] = count
+                if len(groupby) > 1:
+                    group['__context'] = {'group_by': groupby[1:]}
+            else:
+                group['__count'] = count
+            groups.append(group)
+        return groups[offset:offset + limit if limit else None]
+
+    def _fetch_bin_values(self):
+        """Return the values of the recycle bin records that are still soft-deleted, by id."""
+        values = {}
+        for model_name, res_ids in self._get_source_ids().items():
+            source_model = self._get_source_model(model_name)
+            records = source_model.search([('id', 'in', res_ids), ('x_is_deleted', '=', True)])
+            deleted_at = {record.id: record.x_deleted_at for record in records}
+            for res_id, display_name in records.name_get():
+                values[self._encode_id(model_name, res_id)] = {
+                    'res_model': model_name,
+                    'res_id': res_id,
+                    'name': display_name or str(res_id),
+                    'deleted_at': deleted_at[res_id],
+                }
+        return values
+
+    def _read(self, field_names):
+        if not self:
+            return
+        values = self._fetch_bin_values()
+        records = self.browse([bin_id for bin_id in self._ids if bin_id in values])
+        for field_name in field_names:
+            if field_name not in BIN_VALUE_FIELDS:
+                continue
+            self.env.cache.update(records, self._fields[field_name], [values[bin_id][field_name] for bin_id in records._ids])
+
+    def exists(self):
+        values = self._fetch_bin_values()
+        return self.browse([bin_id for bin_id in self._ids if bin_id in values])
+
+    def action_restore(self):
+        """Restore the selected records in their source models."""
+        return self._run_or_queue('restore')
+
+    def action_permanent_delete(self):
+        """Permanently delete the selected records from their source models."""
+        return self._run_or_queue('purge')
+
+    def action_export_csv(self):
+        """Download the recycle bin of the selected records' model as CSV."""
+        return self._export('csv')
+
+    def action_export_jsonl(self):
+        """Download the recycle bin of the selected records' model as JSON lines."""
+        return self._export('jsonl')
+
+    def _export(self, export_format):
+        model_names = list(self._get_source_ids())
+        if len(model_names) != 1:
+            raise UserError(_("Select records of a single model to export its recycle bin."))
+        return {
+            'type': 'ir.actions.act_url',
+            'url': f'/soft_delete_manager/export/{model_names[0]}?export_format={export_format}',
+            'target': 'self',
+        }
+
+    def action_analyze_purge(self):
+        """Report the rows that reference the selected records, without deleting anything."""
+        config = self.env['soft.delete.manager.config']
+        lines = []
+        for model_name, res_ids in self._get_source_ids().items():
+            lines += [
+                _("%(model)s: %(count)s rows of %(table)s.%(column)s (%(action)s)",
+                  model=model_name, count=entry['count'], table=entry['table'],
+                  column=entry['column'], action=entry['action'])
+                for entry in config.analyze_purge_impact(model_name, res_ids)
+            ]
+        return self._notify(
+            _("Permanent delete impact"),
+            "\n".join(lines) or _("No other record references the selected records."),
+            'warning' if lines else 'info',
+        )
+
+    def _run_or_queue(self, operation):
+        """Run the operation per source model, queueing background jobs for large selections."""
+        Job = self.env['soft.delete.job']
+        config = self.env['soft.delete.manager.config']
+        jobs = Job.browse()
+        skipped = []
+        for model_name, res_ids in self._get_source_ids().items():
+            if Job._should_queue(res_ids):
+                jobs |= Job._enqueue(operation, model_name, res_ids)
+            elif operation == 'restore':
+                skipped += [
+                    f"{model_name} {conflict['id']}: {conflict['message']}"
+                    for conflict in config.restore_records(model_name, res_ids)['conflicts']
+                ]
+            else:
+                skipped += [
+                    f"{model_name} {record_id}: {_('still referenced by other records')}"
+                    for record_id in config.permanent_delete_records(model_name, res_ids)['blocked']
+                ]
+        if jobs:
+            return jobs.action_view_jobs()
+        if skipped:
+            title = _("%s records could not be restored", len(skipped)) if operation == 'restore' \
+                else _("%s records could not be deleted", len(skipped))
+            return self._notify(title, "\n".join(skipped[:MAX_REPORTED_CONFLICTS]), 'warning')
+        return True
+
+    def _notify(self, title, message, notification_type):
+        return {
+            'type': 'ir.actions.client',
+            'tag': 'display_notification',
+            'params': {
+                'title': title,
+                'message': message,
+                'type': notification_type,
+                'sticky': True,
+                'next': {'type': 'ir.actions.client', 'tag': 'soft_reload'},
+            },
+        }
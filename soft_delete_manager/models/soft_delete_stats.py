@@ -0,0 +1,192 @@
+from odoo import models, fields, api, _
+from contextlib import contextmanager
+import bisect
+import logging
+import threading
+import time
+
+_logger = logging.getLogger(__name__)
+
+# Upper bounds in milliseconds of the latency histogram buckets, the last bucket has no bound
+LATENCY_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000, 10000, 30000, 60000)
+
+# Number of buffered samples, or seconds since the first one, after which the buffer is written
+STATS_FLUSH_SIZE = 50
+STATS_FLUSH_INTERVAL = 60
+
+# Days of statistics merged into the latency summary of the settings
+STATS_SUMMARY_DAYS = 30
+
+# Buffered samples per database: {(date, res_model, operation): [calls, rows, queries, total_ms, max_ms, histogram]}
+_stats_buffer = {}
+_stats_buffer_since = {}
+_stats_lock = threading.Lock()
+
+
+def _percentile(histogram, fraction):
+    """Return the upper bound in milliseconds of the bucket holding the given fraction of the samples."""
+    total = sum(histogram or ())
+    if not total:
+        return 0.0
+    threshold = total * fraction
+    cumulated = 0
+    for index, count in enumerate(histogram):
+        cumulated += count
+        if cumulated >= threshold:
+            return float(LATENCY_BUCKETS[index] if index < len(LATENCY_BUCKETS) else LATENCY_BUCKETS[-1])
+    return float(LATENCY_BUCKETS[-1])
+
+
+class SoftDeleteStats(models.Model):
+    """Daily aggregated timings of the soft delete operations, per model and operation.
+
+    Samples are buffered in memory per worker and merged into one row per day, model and
+    operation after a commit, so measuring an operation costs no query of its own.
+    """
+    _name = 'soft.delete.stats'
+    _description = 'Soft Delete Statistics'
+    _order = 'date desc, res_model, operation'
+    _rec_name = 'res_model'
+
+    date = fields.Date(string="Date", required=True, readonly=True)
+    res_model = fields.Char(string="Model", required=True, readonly=True)
+    operation = fields.Selection([
+        ('soft_delete', 'Soft Delete'),
+        ('restore', 'Restore'),
+        ('purge', 'Permanent Delete'),
+        ('bin_page', 'Recycle Bin Page'),
+        ('settings', 'Settings Save'),
+    ], string="Operation", required=True, readonly=True)
+    call_count = fields.Integer(string="Calls", readonly=True)
+    row_count = fields.Integer(string="Rows", readonly=True)
+    query_count = fields.Integer(string="Queries", readonly=True)
+    total_ms = fields.Float(string="Total (ms)", readonly=True)
+    max_ms = fields.Float(string="Max (ms)", readonly=True)
+    avg_ms = fields.Float(string="Average (ms)", compute='_compute_latencies')
+    p50_ms = fields.Float(string="p50 (ms)", compute='_compute_latencies')
+    p95_ms = fields.Float(string="p95 (ms)", compute='_compute_latencies')
+
+    def init(self):
+        # The latency histogram is an array column the ORM does not manage
+        self.env.cr.execute("ALTER TABLE soft_delete_stats ADD COLUMN IF NOT EXISTS histogram int4[]")
+        self.env.cr.execute("""
+            CREATE UNIQUE INDEX IF NOT EXISTS soft_delete_stats_key_idx
+            ON soft_delete_stats (date, res_model, operation)
+        """)
+
+    def _compute_latencies(self):
+        histograms = {}
+        if self.ids:
+            self.env.cr.execute("SELECT id, histogram FROM soft_delete_stats WHERE id = ANY(%s)", (list(self.ids),))
+            histograms = dict(self.env.cr.fetchall())
+        for stats in self:
+            histogram = histograms.get(stats.id)
+            stats.avg_ms = stats.total_ms / stats.call_count if stats.call_count else 0.0
+            stats.p50_ms = _percentile(histogram, 0.5)
+            stats.p95_ms = _percentile(histogram, 0.95)
+
+    @api.model
+    @contextmanager
+    def _measure(self, operation, model_name):
+        """Measure the duration and query count of the block; the block sets ``sample['rows']``."""
+        sample = {'rows': 0}
+        query_count = self.env.cr.sql_log_count
+        start = time.perf_counter()
+        yield sample
+        self._record(operation, model_name, (time.perf_counter() - start) * 1000,
+                     sample['rows'], self.env.cr.sql_log_count - query_count)
+
+    @api.model
+    def _record(self, operation, model_name, duration_ms, row_count, query_count):
+        """Add a sample to the buffer of this worker and write the buffer after the commit when it is due."""
+        dbname = self.env.cr.dbname
+        key = (fields.Date.context_today(self), model_name, operation)
+        with _stats_lock:
+            buffer = _stats_buffer.setdefault(dbname, {})
+            _stats_buffer_since.setdefault(dbname, time.monotonic())
+            entry = buffer.setdefault(key, [0, 0, 0, 0.0, 0.0, [0] * (len(LATENCY_BUCKETS) + 1)])
+            entry[0] += 1
+            entry[1] += row_count
+            entry[2] += query_count
+            entry[3] += duration_ms
+            entry[4] = max(entry[4], duration_ms)
+            entry[5][bisect.bisect_left(LATENCY_BUCKETS, duration_ms)] += 1
+            due = sum(e[0] for e in buffer.values()) >= STATS_FLUSH_SIZE \
+                or time.monotonic() - _stats_buffer_since[dbname] >= STATS_FLUSH_INTERVAL
+        if due:
+            registry = self.pool
+            self.env.cr.postcommit.add(lambda: type(self)._flush_buffer(registry, dbname))
+
+    @classmethod
+    def _flush_buffer(cls, registry, dbname):
+        """Merge the buffered samples of the database into the daily rows, from a cursor of its own."""
+        with _stats_lock:
+            buffer = _stats_buffer.pop(dbname, {})
+            _stats_buffer_since.pop(dbname, None)
+        if not buffer:
+            return
+        try:
+            with registry.cursor() as cr:
+                for (date, model_name, operation), (calls, rows, queries, total_ms, max_ms, histogram) in buffer.items():
+                    cr.execute("""
+                        INSERT INTO soft_delete_stats AS s
+                            (date, res_model, operation, call_count, row_count, query_count, total_ms, max_ms,
+                             histogram, create_uid, create_date, write_uid, write_date)
+                        VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s::int4[], 1, now() at time zone 'UTC', 1, now() at time zone 'UTC')
+                        ON CONFLICT (date, res_model, operation) DO UPDATE SET
+                            call_count = s.call_count + EXCLUDED.call_count,
+                            row_count = s.row_count + EXCLUDED.row_count,
+                            query_count = s.query_count + EXCLUDED.query_count,
+                            total_ms = s.total_ms + EXCLUDED.total_ms,
+                            max_ms = GREATEST(s.max_ms, EXCLUDED.max_ms),
+                            histogram = ARRAY(
+                                SELECT COALESCE(a, 0) + COALESCE(b, 0)
+                                FROM unnest(s.histogram, EXCLUDED.histogram) AS h(a, b)
+                            ),
+                            write_date = EXCLUDED.write_date
+                    """, (date, model_name, operation, calls, rows, queries, total_ms, max_ms, histogram))
+            _logger.debug(f"Flushed {len(buffer)} soft delete statistics rows")
+        except Exception as e:
+            _logger.warning(f"Failed to write soft delete statistics: {str(e)}")
+
+    @api.model
+    def get_latency_summary(self, days=STATS_SUMMARY_DAYS):
+        """Return the calls and p50/p95 latencies of the last ``days`` days, per model and operation."""
+        self.env.cr.execute("""
+            SELECT res_model, operation, sum(call_count), sum(total_ms),
+                   ARRAY(SELECT sum(h.count)::int FROM soft_delete_stats s2,
+                         unnest(s2.histogram) WITH ORDINALITY AS h(count, bucket)
+                         WHERE s2.res_model = s.res_model AND s2.operation = s.operation AND s2.date >= %(since)s
+                         GROUP BY h.bucket ORDER BY h.bucket)
+            FROM soft_delete_stats s
+            WHERE date >= %(since)s
+            GROUP BY res_model, operation
+            ORDER BY res_model, operation
+        """, {'since': fields.Date.subtract(fields.Date.context_today(self), days=days)})
+        return [{
+            'model': model_name,
+            'operation': operation,
+            'calls': calls,
+            'avg_ms': total_ms / calls if calls else 0.0,
+            'p50_ms': _percentile(histogram, 0.5),
+            'p95_ms': _percentile(histogram, 0.95),
+        } for model_name, operation, calls, total_ms, histogram in self.env.cr.fetchall()]
+
+    def action_show_latency_summary(self):
+        operations = dict(self._fields['operation']._description_selection(self.env))
+        lines = [
+            _("%(model)s, %(operation)s: p50 %(p50)s ms, p95 %(p95)s ms (%(calls)s calls)",
+              model=entry['model'], operation=operations.get(entry['operation'], entry['operation']),
+              p50=entry['p50_ms'], p95=entry['p95_ms'], calls=entry['calls'])
+            for entry in self.get_latency_summary()
+        ]
+        return {
+            'type': 'ir.actions.client',
+            'tag': 'display_notification',
+            'params': {
+                'title': _("Soft Delete Latencies (last %s days)", STATS_SUMMARY_DAYS),
+                'message': "\n".join(lines) or _("No operation was measured yet."),
+                'type': 'info',
+                'sticky': True,
+            },
+        }
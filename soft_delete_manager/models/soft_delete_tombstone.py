@@ -0,0 +1,143 @@
+from odoo import models, fields, api, _
+from odoo.exceptions import UserError
+import json
+import logging
+
+_logger = logging.getLogger(__name__)
+
+# Default number of days tombstones of purged records are kept
+TOMBSTONE_RETENTION_DAYS = 30
+
+# Number of expired tombstones removed per committed chunk
+TOMBSTONE_PURGE_CHUNK_SIZE = 5000
+
+
+class SoftDeleteTombstone(models.Model):
+    """Snapshot of a permanently deleted row, kept so that a purge can be undone.
+
+    The column values of the row are stored in a ``jsonb`` column the ORM does not manage,
+    written by one ``INSERT ... SELECT to_jsonb(...)`` per purged chunk in the transaction of
+    the delete. PostgreSQL compresses large values through TOAST. Only the row itself is kept:
+    many2many relations and rows removed by ``ON DELETE CASCADE`` are not.
+    """
+    _name = 'soft.delete.tombstone'
+    _description = 'Soft Delete Tombstone'
+    _order = 'date desc, id desc'
+    _rec_name = 'res_model'
+
+    date = fields.Datetime(string="Purged On", required=True, readonly=True)
+    res_model = fields.Char(string="Model", required=True, readonly=True)
+    res_id = fields.Integer(string="Original Record ID", required=True, readonly=True)
+    user_id = fields.Many2one('res.users', string="Purged By", readonly=True)
+    data_display = fields.Text(string="Values", compute='_compute_data_display')
+
+    def init(self):
+        self.env.cr.execute("ALTER TABLE soft_delete_tombstone ADD COLUMN IF NOT EXISTS data jsonb")
+        self.env.cr.execute("""
+            CREATE INDEX IF NOT EXISTS soft_delete_tombstone_model_res_id_idx
+            ON soft_delete_tombstone (res_model, res_id)
+        """)
+        self.env.cr.execute("""
+            CREATE INDEX IF NOT EXISTS soft_delete_tombstone_date_idx
+            ON soft_delete_tombstone (date)
+        """)
+
+    def _compute_data_display(self):
+        values = {}
+        if self.ids:
+            self.env.cr.execute("SELECT id, data FROM soft_delete_tombstone WHERE id = ANY(%s)", (list(self.ids),))
+            values = dict(self.env.cr.fetchall())
+        for tombstone in self:
+            tombstone.data_display = json.dumps(values.get(tombstone.id), indent=2, sort_keys=True, default=str)
+
+    @api.model
+    def _snapshot(self, model_name, record_ids):
+        """Copy the rows of ``record_ids`` into tombstones, with a single query."""
+        if not record_ids:
+            return
+        model = self.env[model_name]
+        model.flush_model()
+        now = fields.Datetime.now()
+        uid = self.env.uid
+        self.env.cr.execute(f"""
+            INSERT INTO soft_delete_tombstone
+                (date, res_model, res_id, user_id, data, create_uid, create_date, write_uid, write_date)
+            SELECT %(now)s, %(model)s, t.id, %(uid)s, to_jsonb(t), %(uid)s, %(now)s, %(uid)s, %(now)s
+            FROM "{model._table}" t
+            WHERE t.id = ANY(%(ids)s)
+        """, {'now': now, 'model': model_name, 'uid': uid, 'ids': list(record_ids)})
+        _logger.debug(f"Saved {self.env.cr.rowcount} tombstones of model {model_name}")
+
+    def action_restore(self):
+        """Re-insert the rows of the tombstones, back in the recycle bin of their model."""
+        restored = self.restore_tombstones()
+        return {
+            'type': 'ir.actions.client',
+            'tag': 'display_notification',
+            'params': {
+                'title': _("Tombstones restored"),
+                'message': _("%s records were put back in their recycle bin.", sum(len(ids) for ids in restored.values())),
+                'type': 'success',
+                'next': {'type': 'ir.actions.client', 'tag': 'soft_reload'},
+            },
+        }
+
+    def restore_tombstones(self):
+        """Re-insert the rows of the tombstones in bulk, one query per model, and drop the tombstones.
+
+        Rows whose id is taken again are skipped and their tombstones kept. The rows come back
+        soft-deleted, with their deletion time reset to now so that the retention purge does
+        not remove them again at its next run. Returns the restored record ids, by model name.
+        """
+        config = self.env['soft.delete.manager.config']
+        now = fields.Datetime.now()
+        restored = {}
+        for model_name in set(self.mapped('res_model')):
+            if model_name not in self.env:
+                raise UserError(_("Model %s no longer exists.", model_name))
+            model = self.env[model_name]
+            model.check_access_rights('create')
+            tombstone_ids = self.filtered(lambda tombstone: tombstone.res_model == model_name).ids
+            self.env.cr.execute(f"""
+                INSERT INTO "{model._table}"
+                SELECT (jsonb_populate_record(
+                    NULL::"{model._table}", data || jsonb_build_object('x_deleted_at', %s::timestamp)
+                )).*
+                FROM soft_delete_tombstone
+                WHERE id = ANY(%s)
+                ON CONFLICT (id) DO NOTHING
+                RETURNING id
+            """, (now, tombstone_ids))
+            record_ids = [row[0] for row in self.env.cr.fetchall()]
+            self.env.cr.execute("""
+                DELETE FROM soft_delete_tombstone
+                WHERE id = ANY(%s) AND res_id = ANY(%s)
+            """, (tombstone_ids, record_ids))
+            model.invalidate_model()
+            config._invalidate_deleted_count(model_name)
+            self.env['soft.delete.journal']._log('unpurge', model_name, record_ids)
+            _logger.info(f"Restored {len(record_ids)} records of model {model_name} from tombstones")
+            restored[model_name] = record_ids
+        self.invalidate_model()
+        return restored
+
+    @api.model_create_multi
+    def create(self, vals_list):
+        raise UserError(_("Tombstones are written by permanent deletes only."))
+
+    def write(self, vals):
+        raise UserError(_("Tombstones cannot be modified."))
+
+    @api.model
+    def _cron_purge_tombstones(self):
+        """Remove the tombstones older than ``soft_delete_manager.tombstone_retention_days``, 0 keeps them forever."""
+        retention_days = int(self.env['ir.config_parameter'].sudo().get_param(
+            'soft_delete_manager.tombstone_retention_days', TOMBSTONE_RETENTION_DAYS))
+        if retention_days <= 0:
+            return
+        cutoff = fields.Datetime.subtract(fields.Datetime.now(), days=retention_days)
+        purged_count = self.env['soft.delete.manager.config']._delete_expired_rows(
+            self._table, cutoff, TOMBSTONE_PURGE_CHUNK_SIZE)
+        self.invalidate_model()
+        if purged_count:
+            _logger.info(f"Purged {purged_count} tombstones older than {retention_days} days")
@@ -3,6 +3,7 @@ import { ListController } from "@web/views/list/list_controller";
 import { registry } from '@web/core/registry';
 import { listView } from '@web/views/list/list_view';
 import { useService } from "@web/core/utils/hooks";
+import { onWillStart, useState } from "@odoo/owl";
 
 export class SoftDeleteManagerListController extends ListController {
     setup() {
@@ -10,75 +11,57 @@ export class SoftDeleteManagerListController extends ListController {
         this.orm = useService("orm");
         this.actionService = useService("action");
         this.notification = useService("notification");
+        this.deletedCount = useState({ count: 0, estimated: false });
         console.info("SoftDeleteManagerListController initialized", {
             model: this.props.resModel,
         });
-    }
-
-    async onRecoverClick() {
-        console.log("Recover button clicked");
-        const modelName = this.props.resModel;
-        // Replace all dots with underscores
-        const wizardModelName = `x_${modelName.replace(/\./g, '_')}_wizard`;
-        console.info("Preparing to populate wizard records", {
-            modelName,
-            wizardModelName,
+        // Not awaited: the badge must never delay the list
+        onWillStart(() => {
+            this.loadDeletedCount();
         });
+    }
 
+    async loadDeletedCount() {
         try {
-            // Find the server action
-            const serverActions = await this.orm.searchRead(
-                'ir.actions.server',
-                [['name', '=', `Populate ${wizardModelName} Records`]],
-                ['id'],
-                { limit: 1 }
+            const result = await this.orm.call(
+                'soft.delete.manager.config',
+                'get_deleted_count',
+                [this.props.resModel]
             );
+            Object.assign(this.deletedCount, result);
+        } catch (err) {
+            console.warn("Could not load the deleted records count", {
+                error: err.message || err,
+                model: this.props.resModel,
+            });
+        }
+    }
 
-            if (!serverActions.length) {
-                console.error("Server action not found", {
-                    actionName: `Populate ${wizardModelName} Records`,
-                    wizardModelName,
-                    modelName,
-                });
-                this.notification.add(
-                    `Server action 'Populate ${wizardModelName} Records' not found. Please ensure the model '${modelName}' is configured in Soft Delete Manager settings.`,
-                    { type: "danger", sticky: true }
-                );
-                return;
-            }
-
-            const serverActionId = serverActions[0].id;
-            console.info("Found server action", { serverActionId, wizardModelName });
-
-            // Execute the server action
-            await this.orm.call('ir.actions.server', 'run', [serverActionId]);
-            console.info("Wizard records populated successfully", { wizardModelName });
+    get deletedCountLabel() {
+        const { count, estimated } = this.deletedCount;
+        return estimated ? `~${count}` : `${count}`;
+    }
 
-            // Capitalize model name for display (e.g., "cargo.short.name.master" -> "Cargo Short Name Master")
-            const displayModelName = modelName
-                .split('.')
-                .map(word => word.charAt(0).toUpperCase() + word.slice(1))
-                .join(' ');
+    async onRecoverClick() {
+        const modelName = this.props.resModel;
+        console.info("Recover button clicked", { modelName });
 
-            // Open the wizard with dynamic name
-            await this.actionService.doAction({
-                type: 'ir.actions.act_window',
-                name: `${displayModelName} Recover Deleted Records`,
-                res_model: wizardModelName,
-                view_mode: 'tree',
-                views: [[false, 'tree']],
-                target: 'current',
-                domain: [['x_model_id.model', '=', modelName]],
-            });
-            console.log("Action triggered to open wizard", { wizardModelName, displayName: `${displayModelName} Recover Deleted Records` });
+        try {
+            // A single call returns the recycle bin action, ready to be opened
+            const action = await this.orm.call(
+                'soft.delete.manager.config',
+                'open_recycle_bin',
+                [modelName]
+            );
+            await this.actionService.doAction(action);
+            console.log("Action triggered to open recycle bin", { modelName, displayName: action.name });
         } catch (err) {
             console.error("Error in onRecoverClick", {
                 error: err.message || err,
                 modelName,
-                wizardModelName,
             });
             this.notification.add(
-                `You are not allowed to access this function: ${err.message || "Unknown error"}`,
+                `Could not open the recycle bin: ${err.data?.message || err.message || "Unknown error"}`,
                 { type: "danger", sticky: true }
             );
         }
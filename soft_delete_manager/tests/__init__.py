@@ -0,0 +1,3 @@
+from . import test_benchmark
+from . import test_cascade_soft_delete
+from . import test_restore_conflicts
@@ -0,0 +1,152 @@
+"""Benchmarks of the soft delete hot paths, excluded from the standard test runs.
+
+Run them against a local database with::
+
+    odoo-bin -d bench -i soft_delete_manager --test-tags soft_delete_benchmark --stop-after-init
+
+Configured through environment variables:
+
+- ``SOFT_DELETE_BENCH_VOLUMES``: comma-separated numbers of seeded rows (default ``10000``),
+  e.g. ``10000,100000,1000000``
+- ``SOFT_DELETE_BENCH_OUTPUT``: path of the JSON results (default ``soft_delete_benchmark.json``)
+- ``SOFT_DELETE_BENCH_BASELINE``: path of previous JSON results to compare against
+- ``SOFT_DELETE_BENCH_THRESHOLD``: tolerated slowdown against the baseline (default ``0.2``, 20%)
+"""
+from odoo.tests import TransactionCase, tagged
+from contextlib import contextmanager
+from unittest.mock import patch
+import json
+import logging
+import os
+import time
+import tracemalloc
+
+_logger = logging.getLogger(__name__)
+
+# Model seeded by the benchmark: a plain table without required relations
+BENCH_MODEL = 'res.partner.industry'
+
+# Number of recycle bin records read per page, as the list view does
+BIN_PAGE_SIZE = 80
+
+# Measured metrics compared against the baseline
+COMPARED_METRICS = ('wall_time_ms', 'query_count')
+
+
+@tagged('-standard', '-at_install', 'post_install', 'soft_delete_benchmark')
+class TestSoftDeleteBenchmark(TransactionCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.volumes = [int(volume) for volume in os.environ.get('SOFT_DELETE_BENCH_VOLUMES', '10000').split(',')]
+        cls.output_path = os.environ.get('SOFT_DELETE_BENCH_OUTPUT', 'soft_delete_benchmark.json')
+        cls.baseline_path = os.environ.get('SOFT_DELETE_BENCH_BASELINE')
+        cls.threshold = float(os.environ.get('SOFT_DELETE_BENCH_THRESHOLD', '0.2'))
+        cls.Config = cls.env['soft.delete.manager.config']
+        cls.model = cls.env['ir.model']._get(BENCH_MODEL)
+
+    def setUp(self):
+        super().setUp()
+        # The settings save commits its configuration, which the test transaction must not do
+        commit_patcher = patch.object(self.env.cr, 'commit', lambda: None)
+        commit_patcher.start()
+        self.addCleanup(commit_patcher.stop)
+
+    @contextmanager
+    def _measure(self, results, operation):
+        """Record wall time, query count and peak Python memory of the block into ``results``."""
+        self.env.flush_all()
+        self.env.invalidate_all()
+        query_count = self.env.cr.sql_log_count
+        tracemalloc.start()
+        start = time.perf_counter()
+        try:
+            yield
+            self.env.flush_all()
+        finally:
+            wall_time = time.perf_counter() - start
+            peak_memory = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+        results[operation] = {
+            'wall_time_ms': round(wall_time * 1000, 2),
+            'query_count': self.env.cr.sql_log_count - query_count,
+            'peak_memory_kb': round(peak_memory / 1024, 1),
+        }
+        _logger.info(f"Benchmark {operation}: {results[operation]}")
+
+    def _seed(self, volume):
+        """Insert ``volume`` rows into the benchmarked table, with a single query."""
+        table = self.env[BENCH_MODEL]._table
+        self.env.cr.execute(f"""
+            INSERT INTO "{table}" (name, full_name, active, create_uid, write_uid, create_date, write_date)
+            SELECT jsonb_build_object('en_US', 'Benchmark ' || g), jsonb_build_object('en_US', 'Benchmark ' || g),
+                   TRUE, %(uid)s, %(uid)s, now() at time zone 'UTC', now() at time zone 'UTC'
+            FROM generate_series(1, %(volume)s) g
+            RETURNING id
+        """, {'uid': self.env.uid, 'volume': volume})
+        self.env[BENCH_MODEL].invalidate_model()
+        return [row[0] for row in self.env.cr.fetchall()]
+
+    def _save_settings(self, model_ids):
+        settings = self.env['res.config.settings'].create({})
+        settings.model_ids = [(6, 0, model_ids)]
+        settings.set_values()
+
+    def _run_volume(self, volume):
+        results = {}
+        configured_ids = self.Config._get_config_state()['model_ids']
+        record_ids = self._seed(volume)
+
+        with self._measure(results, 'set_values'):
+            self._save_settings(list(configured_ids) + [self.model.id])
+            self.Config._cron_enable_models()
+        records = self.env[BENCH_MODEL].browse(record_ids)
+
+        with self._measure(results, 'soft_delete'):
+            records.unlink()
+        with self._measure(results, 'recycle_bin_page'):
+            action = self.Config.open_recycle_bin(BENCH_MODEL)
+            self.env['soft.delete.recycle.bin'].search_read(action['domain'], ['res_model', 'name'], limit=BIN_PAGE_SIZE)
+        with self._measure(results, 'restore_records'):
+            restored = self.Config.restore_records(BENCH_MODEL, record_ids)
+        self.assertEqual(len(restored['restored']), volume)
+
+        records.unlink()
+        with self._measure(results, 'permanent_delete_records'):
+            deleted = self.Config.permanent_delete_records(BENCH_MODEL, record_ids)
+        self.assertEqual(len(deleted['deleted']), volume)
+
+        self._save_settings(list(configured_ids))
+        return results
+
+    def _compare_to_baseline(self, results):
+        """Return the regressions of ``results`` beyond the threshold, against the stored baseline."""
+        with open(self.baseline_path) as baseline_file:
+            baseline = json.load(baseline_file)['volumes']
+        regressions = []
+        for volume, operations in results.items():
+            for operation, metrics in operations.items():
+                reference = baseline.get(volume, {}).get(operation)
+                if not reference:
+                    continue
+                for metric in COMPARED_METRICS:
+                    if reference[metric] and metrics[metric] > reference[metric] * (1 + self.threshold):
+                        regressions.append(
+                            f"{operation} ({volume} rows): {metric} {metrics[metric]} > {reference[metric]} "
+                            f"+{self.threshold:.0%}")
+        return regressions
+
+    def test_benchmark_hot_paths(self):
+        results = {str(volume): self._run_volume(volume) for volume in self.volumes}
+        with open(self.output_path, 'w') as output_file:
+            json.dump({
+                'model': BENCH_MODEL,
+                'date': time.strftime('%Y-%m-%dT%H:%M:%S'),
+                'volumes': results,
+            }, output_file, indent=2, sort_keys=True)
+        _logger.info(f"Benchmark results written to {self.output_path}")
+
+        if self.baseline_path:
+            regressions = self._compare_to_baseline(results)
+            self.assertFalse(regressions, "Performance regressions:\n" + "\n".join(regressions))
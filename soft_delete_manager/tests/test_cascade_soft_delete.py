@@ -0,0 +1,64 @@
+from odoo import fields
+from odoo.tests import TransactionCase, tagged
+from datetime import timedelta
+from unittest.mock import patch
+
+# Model soft deleted by the tests: its contacts are its one2many children on parent_id
+TEST_MODEL = 'res.partner'
+
+
+@tagged('-at_install', 'post_install')
+class TestCascadeSoftDelete(TransactionCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.Config = cls.env['soft.delete.manager.config']
+        cls.Partner = cls.env[TEST_MODEL]
+
+    def setUp(self):
+        super().setUp()
+        # The settings save commits its configuration, which the test transaction must not do
+        commit_patcher = patch.object(self.env.cr, 'commit', lambda: None)
+        commit_patcher.start()
+        self.addCleanup(commit_patcher.stop)
+        settings = self.env['res.config.settings'].create({})
+        settings.model_ids = [(4, self.env['ir.model']._get(TEST_MODEL).id)]
+        settings.cascade_soft_delete = True
+        settings.set_values()
+        self.Config._cron_enable_models()
+        self.company = self.Partner.create({'name': 'Soft Delete Company', 'is_company': True})
+        self.contact = self.Partner.create({'name': 'Soft Delete Contact', 'parent_id': self.company.id})
+        self.address = self.Partner.create({'name': 'Soft Delete Address', 'parent_id': self.contact.id})
+        self.other_contact = self.Partner.create({'name': 'Soft Delete Other Contact', 'parent_id': self.company.id})
+
+    def _deleted(self, partners):
+        return partners.with_context(include_deleted=True).mapped('x_is_deleted')
+
+    def test_cascade_soft_delete(self):
+        self.company.unlink()
+
+        partners = self.company | self.contact | self.address | self.other_contact
+        self.assertEqual(self._deleted(partners), [True] * 4)
+        deleted_at = self.company.with_context(include_deleted=True).x_deleted_at
+        self.assertEqual(set(partners.with_context(include_deleted=True).mapped('x_deleted_at')), {deleted_at})
+
+    def test_cascade_restore_with_parent(self):
+        self.company.unlink()
+
+        result = self.Config.restore_records(TEST_MODEL, self.company.ids)
+
+        self.assertEqual(result['restored'], self.company.ids)
+        partners = self.company | self.contact | self.address | self.other_contact
+        self.assertEqual(self._deleted(partners), [False] * 4)
+
+    def test_cascade_restore_keeps_child_deleted_beforehand(self):
+        self.other_contact.unlink()
+        # Deleted an hour before its parent, rather than within the same second
+        self.other_contact.with_context(include_deleted=True).x_deleted_at = fields.Datetime.now() - timedelta(hours=1)
+        self.company.unlink()
+
+        self.Config.restore_records(TEST_MODEL, self.company.ids)
+
+        self.assertEqual(self._deleted(self.company | self.contact | self.address), [False] * 3)
+        self.assertEqual(self._deleted(self.other_contact), [True])
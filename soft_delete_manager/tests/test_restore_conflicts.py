@@ -0,0 +1,63 @@
+from odoo.tests import TransactionCase, tagged
+from unittest.mock import patch
+
+# Model restored by the tests: a plain table without required relations
+TEST_MODEL = 'res.partner.industry'
+
+# Partial unique index created by the tests, keeping the names of live records unique
+LIVE_NAME_INDEX = 'test_soft_delete_industry_live_name_uniq'
+
+
+@tagged('-at_install', 'post_install')
+class TestRestoreConflicts(TransactionCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.Config = cls.env['soft.delete.manager.config']
+        cls.Industry = cls.env[TEST_MODEL]
+
+    def setUp(self):
+        super().setUp()
+        # The settings save commits its configuration, which the test transaction must not do
+        commit_patcher = patch.object(self.env.cr, 'commit', lambda: None)
+        commit_patcher.start()
+        self.addCleanup(commit_patcher.stop)
+        settings = self.env['res.config.settings'].create({})
+        settings.model_ids = [(4, self.env['ir.model']._get(TEST_MODEL).id)]
+        settings.set_values()
+        self.Config._cron_enable_models()
+        self.env.cr.execute(f"""
+            CREATE UNIQUE INDEX "{LIVE_NAME_INDEX}" ON "{self.Industry._table}" (full_name)
+            WHERE x_is_deleted IS NOT TRUE
+        """)
+
+    def test_restore_conflict_with_live_record(self):
+        deleted = self.Industry.create({'name': 'Soft Delete Conflict', 'full_name': 'Soft Delete Conflict'})
+        deleted.unlink()
+        live = self.Industry.create({'name': 'Soft Delete Conflict', 'full_name': 'Soft Delete Conflict'})
+
+        result = self.Config.restore_records(TEST_MODEL, deleted.ids)
+
+        self.assertEqual(result['restored'], [])
+        self.assertEqual(len(result['conflicts']), 1)
+        conflict = result['conflicts'][0]
+        self.assertEqual(conflict['id'], deleted.id)
+        self.assertEqual(conflict['constraint'], LIVE_NAME_INDEX)
+        self.assertEqual(conflict['conflicting_id'], live.id)
+        self.assertTrue(deleted.with_context(include_deleted=True).x_is_deleted)
+
+    def test_restore_conflict_within_batch(self):
+        first, second = self.Industry.create([
+            {'name': 'Soft Delete Twin', 'full_name': 'Soft Delete Twin'},
+            {'name': 'Soft Delete Twin 2', 'full_name': 'Soft Delete Twin 2'},
+        ])
+        first.unlink()
+        second.full_name = 'Soft Delete Twin'
+        second.unlink()
+
+        result = self.Config.restore_records(TEST_MODEL, (first | second).ids)
+
+        self.assertEqual(result['restored'], first.ids)
+        self.assertEqual([conflict['id'] for conflict in result['conflicts']], second.ids)
+        self.assertEqual(result['conflicts'][0]['conflicting_id'], first.id)